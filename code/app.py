@@ -10,7 +10,9 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 
+import config
 import data_loader
+from data_stats import DatasetStats, GroupCube, approximate_stats, load_group_cube
 from data_explore import (
     explore_missing_values,
     explore_numeric_features,
@@ -37,18 +39,62 @@ st.divider()
 
 # 数据加载
 @st.cache_data
-def load_data():
+def load_sample(sample: int):
     """
-    加载原始数据（只读）
+    按 lifecycle 分层抽样的样本，以及各分层在全量数据中的行数
     """
+    return data_loader.load_raw_sample(sample, config.TARGET_COL)
+
+
+@st.cache_data
+def load_data(sample: int | None = None):
+    """
+    加载原始数据（只读），设置 sample 时只加载按 lifecycle 分层抽样的样本
+    """
+    if sample:
+        return load_sample(sample)[0]
     return data_loader.load_raw_data()
 
 
-df = load_data()
+@st.cache_data
+def load_approx(sample: int):
+    """
+    抽样模式下的近似统计，每个统计量附带置信区间
+    """
+    sample_df, strata_counts = load_sample(sample)
+    return approximate_stats(sample_df, strata_counts, config.TARGET_COL)
+
+
+@st.cache_resource
+def load_stats():
+    """
+    一次扫描得到的统计状态，相关性矩阵和排好序的特征对缓存在其中，
+    滑动阈值时只重新截取
+    """
+    return DatasetStats.from_frame(load_data(config.DASHBOARD_SAMPLE))
+
+
+@st.cache_resource
+def load_cube():
+    """
+    lifecycle × 特征 的计数立方体（持久化在缓存目录），切换特征时直接查表
+    """
+    if config.DASHBOARD_SAMPLE:
+        # 样本上的立方体不落盘，避免覆盖全量数据的缓存
+        return GroupCube("lifecycle").build(load_data(config.DASHBOARD_SAMPLE))
+    return load_group_cube("lifecycle", load_data())
+
+
+df = load_data(config.DASHBOARD_SAMPLE)
+stats = load_stats()
+cube = load_cube()
+approx = load_approx(config.DASHBOARD_SAMPLE) if config.DASHBOARD_SAMPLE else None
 
 st.success(
     f"数据加载完成：共 {df.shape[0]} 行，{df.shape[1]} 列"
 )
+if config.DASHBOARD_SAMPLE:
+    st.info(f"当前为抽样模式（按 lifecycle 分层抽样 {config.DASHBOARD_SAMPLE} 行），统计结果为近似值")
 
 # 5. 创建页面 Tabs
 tab1, tab2, tab3, tab4, tab5 = st.tabs([
@@ -73,6 +119,11 @@ with tab1:
     st.subheader("📄 数据预览（前 5 行）")
     st.dataframe(df.head(), use_container_width=True)
 
+    if approx is not None:
+        st.markdown(f"### 📐 数值特征估计（{approx['confidence']:.0%} 置信区间）")
+        st.dataframe(approx["numeric"], use_container_width=True)
+        st.caption("min / max 为样本极值：全量最小值不大于 min，最大值不小于 max，没有置信区间")
+
     st.info(
         "本数据集为电商用户行为数据，"
         "目标是分析不同生命周期（lifecycle）用户的特征差异。"
@@ -82,7 +133,11 @@ with tab1:
 with tab2:
     st.subheader("🔍 字段缺失情况分析")
 
-    missing_df = explore_missing_values(df)
+    if approx is not None:
+        # 抽样模式：分层估计的缺失率及置信区间
+        missing_df = approx["missing"]
+    else:
+        missing_df = explore_missing_values(df, stats=stats)
     st.dataframe(missing_df, use_container_width=True)
 
     st.info(
@@ -135,7 +190,8 @@ with tab4:
         df,
         group_col="lifecycle",
         feature_col=feature_col,
-        normalize=True
+        normalize=True,
+        cube=cube
     )
 
     st.dataframe(group_df, use_container_width=True)
@@ -160,7 +216,8 @@ with tab5:
     corr_matrix, strong_corr = explore_correlation(
         df,
         method="pearson",
-        threshold=threshold
+        threshold=threshold,
+        stats=stats
     )
 
     with st.expander("📊 查看相关性矩阵"):
@@ -170,6 +227,12 @@ with tab5:
         if strong_corr.empty:
             st.warning("当前阈值下未发现强相关特征对")
         else:
+            if approx is not None:
+                # 抽样模式：附上 Fisher z 置信区间
+                _, lower, upper = approx["correlation"]
+                rows = lower.index.get_indexer(strong_corr["feature1"])
+                cols = lower.columns.get_indexer(strong_corr["feature2"])
+                strong_corr = strong_corr.assign(lower=lower.to_numpy()[rows, cols], upper=upper.to_numpy()[rows, cols])
             st.dataframe(strong_corr, use_container_width=True)
 
     st.info(
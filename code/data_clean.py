@@ -1,10 +1,15 @@
+import os
+import shutil
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 import pandas as pd
 
 import config
 import data_loader
 from data_explore import split_columns_clean
+from dtype_policy import compact_dtypes
 
 
 def handle_missing_values(
@@ -26,7 +31,7 @@ def handle_missing_values(
         # 创建缺失值标志列名
         null_flag_col = f"{col}_is_null"
         # 创建一个新列，标记原始列中哪些值是缺失的（1表示缺失，0表示非缺失）
-        df_new[null_flag_col] = df_new[col].isnull().astype(int)
+        df_new[null_flag_col] = df_new[col].isnull().astype(config.FLAG_DTYPE)
         # 用-1填充原始列中的缺失值
         df_new[col] = df_new[col].fillna(-1)
     return df_new
@@ -46,70 +51,590 @@ def handle_categorical_missing(df: pd.DataFrame, categorical_cols: list, fill_va
     return df_new
 
 
-def mark_abnormal_values(df: pd.DataFrame) -> pd.DataFrame:
+_COMPARE_OPS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "!=": np.not_equal
+}
+
+
+def _compile_rule(rule: dict):
+    """
+    把一条声明式规则编译为向量化掩码函数（内部函数）
+    规则类型（命中即视为异常）：
+    - range：  {"col", "min", "max", "min_inclusive", "max_inclusive"}，不在区间内
+    - isin：   {"col", "values"}，取值不在允许集合内（缺失值不判定）
+    - regex：  {"col", "pattern"}，不完全匹配正则（缺失值不判定）
+    - compare：{"left", "op", "right"}，两列比较结果为真，如 left > right
+    :param rule: 规则字典，必须包含 name 和 type
+    :return: (依赖的列, 掩码函数)，掩码函数接收 {列名: 数组}，返回布尔数组
+    """
+    rule_type = rule["type"]
+    if rule_type == "range":
+        col = rule["col"]
+        low, high = rule.get("min"), rule.get("max")
+        low_op = np.less if rule.get("min_inclusive", True) else np.less_equal
+        high_op = np.greater if rule.get("max_inclusive", True) else np.greater_equal
+
+        def mask(columns):
+            values = columns[col]
+            hit = np.zeros(len(values), dtype=bool)
+            if low is not None:
+                hit |= low_op(values, low)
+            if high is not None:
+                hit |= high_op(values, high)
+            return hit
+
+        return [col], mask
+    if rule_type == "isin":
+        col = rule["col"]
+        allowed = pd.Index(rule["values"])
+
+        def mask(columns):
+            values = columns[col]
+            return (allowed.get_indexer(values) < 0) & pd.notna(values)
+
+        return [col], mask
+    if rule_type == "regex":
+        col = rule["col"]
+        pattern = rule["pattern"]
+
+        def mask(columns):
+            values = pd.Series(columns[col], dtype="string")
+            return (~values.str.fullmatch(pattern)).fillna(False).to_numpy(dtype=bool)
+
+        return [col], mask
+    if rule_type == "compare":
+        left, right = rule["left"], rule["right"]
+        op = _COMPARE_OPS[rule["op"]]
+
+        def mask(columns):
+            return op(columns[left], columns[right])
+
+        return [left, right], mask
+    raise ValueError(f"不支持的规则类型: {rule_type}")
+
+
+def evaluate_abnormal_rules(df: pd.DataFrame, rules: list | None = None) -> tuple[dict, pd.DataFrame]:
+    """
+    计算每条异常规则的命中标记，不修改 df
+    - 规则来自 config.ABNORMAL_RULES，编译为 NumPy 掩码
+    - 每个被引用的列只取一次底层数组，所有规则在这些数组上计算
+    - 规则引用的列不存在时跳过该规则
+    - 缺失值不判定为异常：应在填充缺失值之前调用
+    :param df: DataFrame
+    :param rules: 规则列表，默认 config.ABNORMAL_RULES
+    :return:
+        flags: {规则 name: 标记数组}
+        report: 每条规则的命中数和耗时
+    """
+    rules = config.ABNORMAL_RULES if rules is None else rules
+    columns = {}
+    flags = {}
+    report = []
+    for rule in rules:
+        cols, mask = _compile_rule(rule)
+        if any(col not in df.columns for col in cols):
+            continue
+        start = time.perf_counter()
+        for col in cols:
+            if col not in columns:
+                columns[col] = df[col].to_numpy()
+        hit = mask(columns)
+        flags[rule["name"]] = hit.astype(config.FLAG_DTYPE)
+        report.append({
+            "rule": rule["name"],
+            "type": rule["type"],
+            "hits": int(hit.sum()),
+            "seconds": time.perf_counter() - start
+        })
+    return flags, pd.DataFrame(report, columns=["rule", "type", "hits", "seconds"])
+
+
+def apply_abnormal_rules(
+        df: pd.DataFrame,
+        rules: list | None = None,
+        inplace: bool = False
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    异常值规则引擎（不修改原始数值）
+    规则由 evaluate_abnormal_rules 计算，所有异常标记列（列名为规则 name）一次性插入
+    :param df: DataFrame
+    :param rules: 规则列表，默认 config.ABNORMAL_RULES
+    :param inplace: 是否直接修改传入的 df，默认 False
+    :return:
+        df_new: 添加异常标记列后的数据
+        report: 每条规则的命中数和耗时
+    """
+    flags, report = evaluate_abnormal_rules(df, rules)
+    df_new = df if inplace else df.copy()
+    if flags:
+        df_new[list(flags)] = np.column_stack(list(flags.values()))
+    return df_new, report
+
+
+def mark_abnormal_values(df: pd.DataFrame, rules: list | None = None) -> pd.DataFrame:
     """
     异常值标记（不修改原始数值）
-    当前仅对 age 进行简单规则标记
+    规则由 config.ABNORMAL_RULES 配置，默认只有 age 规则：
     - age <= 0 或 age > 100 视为异常
     :param df: DataFrame
+    :param rules: 规则列表，默认 config.ABNORMAL_RULES
     :return: 添加异常标记列后的 DataFrame数据集
     """
-    df_new = df.copy()
-    if "age" in df_new.columns:
-        df_new["age_abnormal"] = (
-                (df_new["age"] <= 0) | (df_new["age"] > 100)
-        ).astype(int)
+    df_new, _ = apply_abnormal_rules(df, rules)
+    return df_new
+
+
+def clean_values(
+        df: pd.DataFrame,
+        numeric_cols: list,
+        categorical_cols: list,
+        fill_value: int = -1,
+        categorical_fill_value: str = 'Unknown',
+        inplace: bool = False,
+        rules: list | None = None
+) -> pd.DataFrame:
+    """
+    单次融合清洗：缺失标志、缺失填充和异常标记一次完成，不在每一步复制整张表
+    - 所有 _is_null 标志列由一次 isnull 块运算生成，一次性插入
+    - 异常规则在填充前的原始值上判定（缺失值不判定为异常，填充值 -1 / 'Unknown' 不会被误标），
+      填充后再插入标记列
+    - 数值列和类别列的缺失值由一次 fillna 填充
+    :param df: 原始数据
+    :param numeric_cols: 数值列
+    :param categorical_cols: 类别列
+    :param fill_value: 数值缺失填充值，默认 -1
+    :param categorical_fill_value: 类别缺失填充值，默认 'Unknown'
+    :param inplace: 是否直接修改传入的 df（不复制），默认 False
+    :param rules: 异常规则列表，默认 config.ABNORMAL_RULES
+    :return: 清洗后的数据
+    """
+    df_new = df if inplace else df.copy()
+    # 1. 所有数值列的缺失标志一次生成
+    null_flags = df_new[numeric_cols].isnull().to_numpy().astype(config.FLAG_DTYPE)
+    # 2. 异常规则在填充前判定，缺失值不计为异常
+    abnormal_flags, report = evaluate_abnormal_rules(df_new, rules)
+    # 3. 数值列和类别列的缺失值一次填充
+    fill_values = {col: fill_value for col in numeric_cols}
+    fill_values.update({col: categorical_fill_value for col in categorical_cols})
+    # category 列（分块读取时）需要先把填充值加入类别
+    for col in categorical_cols:
+        if (isinstance(df_new[col].dtype, pd.CategoricalDtype)
+                and categorical_fill_value not in df_new[col].cat.categories):
+            df_new[col] = df_new[col].cat.add_categories([categorical_fill_value])
+    df_new.fillna(fill_values, inplace=True)
+    # 4. 缺失标志列和异常标记列整块插入，避免逐列追加造成的碎片化
+    df_new[[f"{col}_is_null" for col in numeric_cols]] = null_flags
+    if abnormal_flags:
+        df_new[list(abnormal_flags)] = np.column_stack(list(abnormal_flags.values()))
+    if not report.empty:
+        print(f"异常规则命中情况：\n{report}")
     return df_new
 
 
-def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
+def _canonical_column(series: pd.Series) -> pd.Series:
+    """
+    把一列转换为与存储类型无关的表示，供行哈希使用（内部函数）
+    分块读取时同一列在不同块里可能是 int8 / int16 / float32（块内有缺失）/ category / 字符串，
+    而 hash_pandas_object 的结果依赖类型：
+    - 整数、浮点、布尔统一为 float64（超出 2^53 的 int64 保持原样，避免精度丢失造成误判重复）
+    - category、object、字符串统一为 str，缺失值保持为缺失
+    :param series: 列
+    :return: 规范化后的列
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_object_dtype(dtype) \
+            or pd.api.types.is_string_dtype(dtype):
+        return series.astype(str)
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_numeric_dtype(dtype):
+        if pd.api.types.is_integer_dtype(dtype) and dtype.itemsize == 8 and len(series) \
+                and series.abs().max() > 2 ** 53:
+            return series
+        return series.astype(np.float64)
+    return series
+
+
+def hash_rows(df: pd.DataFrame) -> np.ndarray:
+    """
+    向量化计算每行的 64 位哈希（不含索引）
+    先把各列转换为与存储类型无关的表示（见 _canonical_column），相同取值在不同数据块中
+    即使被压缩成不同类型，哈希也一致
+    :param df: DataFrame
+    :return: uint64 数组，长度等于行数
+    """
+    canonical = pd.DataFrame({i: _canonical_column(df.iloc[:, i]) for i in range(df.shape[1])}, copy=False)
+    return pd.util.hash_pandas_object(canonical, index=False).to_numpy()
+
+
+class RowHashSet:
+    """
+    精确的行哈希集合，跨数据块 / 跨增量运行记录已出现的行
+    以有序 uint64 数组存储，每行 8 字节，可保存到 .npy 文件
+    """
+
+    def __init__(self, path: str | None = None):
+        """
+        :param path: 持久化文件路径，文件存在时自动加载
+        """
+        self.path = path
+        if path is not None and os.path.exists(path):
+            self.hashes = np.load(path)
+        else:
+            self.hashes = np.empty(0, dtype=np.uint64)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        :param hashes: 行哈希
+        :return: 布尔数组，已出现过的行为 True
+        """
+        # self.hashes 有序，二分查找即可，不必像 np.isin 那样对整个集合重新排序
+        idx = np.searchsorted(self.hashes, hashes)
+        hit = idx < self.hashes.size
+        hit[hit] = self.hashes[idx[hit]] == hashes[hit]
+        return hit
+
+    def add(self, hashes: np.ndarray) -> None:
+        """
+        把新哈希有序插入集合，只对本块排序，已有集合只做一次线性拷贝
+        :param hashes: 新出现的行哈希
+        """
+        new = np.unique(np.asarray(hashes, dtype=np.uint64))
+        new = new[~self.contains(new)]
+        if new.size:
+            self.hashes = np.insert(self.hashes, np.searchsorted(self.hashes, new), new)
+
+    def save(self, path: str | None = None) -> None:
+        """
+        :param path: 保存路径，默认使用初始化时的路径
+        """
+        np.save(path or self.path, self.hashes)
+
+
+class BloomRowHashSet:
+    """
+    布隆过滤器版本的行哈希集合，与 RowHashSet 接口一致
+    内存只与预期行数和误判率有关；误判会把极少量非重复行当作重复行删除
+    """
+
+    def __init__(
+            self,
+            capacity: int,
+            error_rate: float = 0.001,
+            path: str | None = None
+    ):
+        """
+        :param capacity: 预期最多记录的行数
+        :param error_rate: 可接受的误判率
+        :param path: 持久化文件路径（.npz，连同位数和哈希函数个数一起保存），文件存在时自动加载，
+            此时以文件中的参数为准，capacity 和 error_rate 不再生效
+        """
+        self.path = path
+        if path is not None and os.path.exists(path):
+            with np.load(path) as data:
+                self.bits = data["bits"]
+                self.num_bits = int(data["num_bits"])
+                self.num_hashes = int(data["num_hashes"])
+        else:
+            # 位数组大小和哈希函数个数取布隆过滤器的最优值
+            num_bits = int(np.ceil(-capacity * np.log(error_rate) / np.log(2) ** 2))
+            self.num_hashes = max(1, int(round(num_bits / capacity * np.log(2))))
+            self.bits = np.zeros((num_bits + 7) // 8, dtype=np.uint8)
+            self.num_bits = self.bits.size * 8
+
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        双重哈希生成每行的 k 个位位置（内部方法）
+        :param hashes: 行哈希
+        :return: 形状为 (行数, k) 的位位置
+        """
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        steps = np.arange(self.num_hashes, dtype=np.uint64)
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.num_bits)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        :param hashes: 行哈希
+        :return: 布尔数组，可能已出现过的行为 True
+        """
+        pos = self._positions(hashes)
+        hit = (self.bits[pos >> np.uint64(3)] >> (pos & np.uint64(7)).astype(np.uint8)) & 1
+        return hit.all(axis=1)
+
+    def add(self, hashes: np.ndarray) -> None:
+        """
+        :param hashes: 新出现的行哈希
+        """
+        pos = self._positions(hashes).ravel()
+        np.bitwise_or.at(
+            self.bits,
+            (pos >> np.uint64(3)).astype(np.intp),
+            np.left_shift(1, pos & np.uint64(7)).astype(np.uint8)
+        )
+
+    def save(self, path: str | None = None) -> None:
+        """
+        :param path: 保存路径，默认使用初始化时的路径
+        """
+        # 写入文件句柄，避免 np.savez 自动追加 .npz 扩展名
+        with open(path or self.path, "wb") as f:
+            np.savez(f, bits=self.bits, num_bits=self.num_bits, num_hashes=self.num_hashes)
+
+
+def make_row_hash_set(
+        expected_rows: int | None = None,
+        memory_mb: float | None = None,
+        error_rate: float | None = None,
+        path: str | None = None
+) -> RowHashSet | BloomRowHashSet:
+    """
+    按内存上限选择跨块去重的行哈希集合，峰值内存由配置决定，不随总行数线性增长
+    - 预计行数已知且精确集合（每行 8 字节）不超过上限时使用 RowHashSet
+    - 否则使用布隆过滤器，位数组不超过上限；预计行数超出上限能容纳的行数时误判率会升高
+    :param expected_rows: 预计总行数（见 data_loader.estimate_num_rows），None 表示未知
+    :param memory_mb: 内存上限（MB），默认 config.DEDUP_MEMORY_MB
+    :param error_rate: 布隆过滤器的目标误判率，默认 config.DEDUP_ERROR_RATE
+    :param path: 持久化文件路径
+    :return: RowHashSet 或 BloomRowHashSet
+    """
+    memory_bytes = (memory_mb or config.DEDUP_MEMORY_MB) * 1024 ** 2
+    error_rate = error_rate or config.DEDUP_ERROR_RATE
+    if expected_rows is not None and expected_rows * 8 <= memory_bytes:
+        return RowHashSet(path)
+    # 位数组上限能在目标误判率下容纳的行数
+    max_capacity = int(memory_bytes * 8 * np.log(2) ** 2 / -np.log(error_rate))
+    capacity = max_capacity if expected_rows is None else min(expected_rows, max_capacity)
+    if expected_rows is not None and expected_rows > max_capacity:
+        print(f"预计行数 {expected_rows} 超出去重内存上限可容纳的 {max_capacity} 行，布隆过滤器误判率将高于 {error_rate}")
+    return BloomRowHashSet(max(capacity, 1), error_rate, path)
+
+
+def remove_duplicates(
+        df: pd.DataFrame,
+        seen: RowHashSet | BloomRowHashSet | None = None
+) -> pd.DataFrame:
     """
     重复值处理
-    - 统计重复行数量
+    - 每行只计算一次 64 位哈希，统计和删除都基于同一份哈希
     - 删除完全重复的行（保留第一条）
+    - 传入 seen 时同时删除之前数据块 / 之前运行中已出现过的行，并把新行加入 seen，
+      可对超出内存的数据逐块去重
     :param df: DataFrame
+    :param seen: 跨块共享的行哈希集合，默认 None（只在当前 df 内去重）
     :return: 去重后的 DataFrame数据集
     """
+    hashes = hash_rows(df)
     # 统计重复行数量
-    dup_count = df.duplicated().sum()
+    dup_mask = pd.Series(hashes).duplicated(keep="first").to_numpy()
+    if seen is not None:
+        dup_mask = dup_mask | seen.contains(hashes)
+        seen.add(hashes[~dup_mask])
+    dup_count = int(dup_mask.sum())
     if dup_count > 0:
         print(f"发现重复行数量：{dup_count}，已执行删除")
         # 删除重复行，保留第一次出现的
-        df_new = df.drop_duplicates(keep="first")
+        df_new = df[~dup_mask]
     else:
         print("未发现重复行")
+        df_new = df
     return df_new
 
 
-def save_clean_data(df: pd.DataFrame, path: str) -> None:
+# 后台写入快照使用的单线程执行器，保证多次保存按提交顺序完成
+_WRITER = ThreadPoolExecutor(max_workers=1)
+# 尚未确认完成的后台写入，由 wait_clean_data 等待
+_PENDING_SAVES = []
+# 分区列缺失值对应的目录名，与 Hive / Spark 的约定一致
+HIVE_DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def _write_frame(df: pd.DataFrame, path: str, fmt: str, compression: str | None) -> None:
+    """
+    按格式写出单个文件（内部函数）
+    :param df: DataFrame
+    :param path: 文件路径
+    :param fmt: 'csv' / 'parquet' / 'feather'
+    :param compression: 压缩算法，None 表示使用该格式的默认值
+    """
+    if fmt == "parquet":
+        df.to_parquet(path, index=False, compression=compression or "snappy")
+    elif fmt == "feather":
+        df.reset_index(drop=True).to_feather(path, compression=compression or "lz4")
+    elif fmt == "csv":
+        df.to_csv(path, index=False, compression=compression)
+    else:
+        raise ValueError(f"不支持的保存格式: {fmt}")
+
+
+def _save_clean_data(
+        df: pd.DataFrame,
+        path: str,
+        fmt: str,
+        compression: str | None,
+        partition_col: str | None
+) -> dict:
+    """
+    保存清洗后的数据并统计写入量（内部函数）
+    :return: 写入字节数、耗时和吞吐
+    """
+    start = time.time()
+    if partition_col is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        _write_frame(df, path, fmt, compression)
+        files = [path]
+    else:
+        # 按列取值分区：path/<列名>=<取值>/part-0.<格式>，缺失值写入 Hive 默认分区；
+        # 分区列只体现在目录名里，不写进文件，否则读回时目录推断的类型和文件里的类型冲突
+        # 先写临时目录再整体替换，旧快照里已不存在的分区目录随之清除
+        tmp_dir = f"{path.rstrip(os.sep)}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        files = []
+        for value, group in df.groupby(partition_col, observed=True, sort=True, dropna=False):
+            value = HIVE_DEFAULT_PARTITION if pd.isna(value) else value
+            part_dir = os.path.join(tmp_dir, f"{partition_col}={value}")
+            os.makedirs(part_dir, exist_ok=True)
+            part_name = f"part-0.{fmt}"
+            _write_frame(group.drop(columns=partition_col), os.path.join(part_dir, part_name), fmt, compression)
+            files.append(os.path.join(path, f"{partition_col}={value}", part_name))
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_dir, path)
+    elapsed = time.time() - start
+    num_bytes = sum(os.path.getsize(file) for file in files)
+    stats = {
+        "path": path,
+        "bytes": num_bytes,
+        "seconds": elapsed,
+        "mb_per_sec": num_bytes / 1024 ** 2 / max(elapsed, 1e-9)
+    }
+    print(f"清洗后数据已保存至：{path}（{num_bytes / 1024 ** 2:.2f} MB，"
+          f"耗时 {elapsed:.2f}s，{stats['mb_per_sec']:.1f} MB/s）")
+    return stats
+
+
+def save_clean_data(
+        df: pd.DataFrame,
+        path: str,
+        compression: str | None = None,
+        partition_col: str | None = None,
+        background: bool = False
+):
     """
     保存清洗后的数据
+    - 格式由扩展名决定：.parquet / .feather 为列式压缩格式，.csv 保持原有行为
+    - partition_col 不为空时按该列（如 lifecycle）分区写入目录
+    - background=True 时在后台线程写入，调用方可以直接进入特征工程
     :param df: DataFrame
     :param path: 保存路径
+    :param compression: 压缩算法（如 'zstd'、'snappy'、'lz4'），默认使用格式默认值
+    :param partition_col: 分区列，默认 None（不分区）
+    :param background: 是否后台写入，默认 False
+    :return: 写入统计（字节数、耗时、吞吐）；后台写入时返回 Future，result() 得到统计
+    """
+    fmt = os.path.splitext(path)[1].lstrip(".").lower() or "parquet"
+    if background:
+        future = _WRITER.submit(_save_clean_data, df, path, fmt, compression, partition_col)
+        # 后台写入失败时输出错误，避免异常被静默吞掉
+        future.add_done_callback(
+            lambda f: f.exception() is not None and print(f"清洗后数据保存失败：{f.exception()}")
+        )
+        _PENDING_SAVES.append(future)
+        return future
+    return _save_clean_data(df, path, fmt, compression, partition_col)
+
+
+def load_clean_data(path: str) -> pd.DataFrame:
     """
-    df.to_csv(path, index=False)
-    print(f"清洗后数据已保存至：{path}")
+    读取 save_clean_data 保存的快照，分区目录的分区列按字符串读回，默认分区读回为缺失值
+    :param path: 保存路径（文件或分区目录）
+    :return: DataFrame
+    """
+    if not os.path.isdir(path):
+        fmt = os.path.splitext(path)[1].lstrip(".").lower()
+        if fmt == "feather":
+            return pd.read_feather(path)
+        if fmt == "csv":
+            return pd.read_csv(path)
+        return pd.read_parquet(path)
+    # 关闭字典推断：pyarrow 无法合并含缺失值的分区字典
+    import pyarrow.dataset as ds
+    partitioning = ds.HivePartitioning.discover(infer_dictionary=False)
+    return ds.dataset(path, partitioning=partitioning).to_table().to_pandas()
+
+
+def wait_clean_data() -> list:
+    """
+    等待所有后台保存完成，写入失败时在这里抛出异常
+    :return: 各次写入的统计
+    """
+    stats = []
+    while _PENDING_SAVES:
+        stats.append(_PENDING_SAVES.pop(0).result())
+    return stats
 
 
 def data_clean(
         df: pd.DataFrame,
         numeric_cols: list,
-        categorical_cols: list
+        categorical_cols: list,
+        inplace: bool = False,
+        seen: RowHashSet | BloomRowHashSet | None = None,
+        background_save: bool = False
 ) -> pd.DataFrame:
     """
     数据清洗主函数
+    缺失值处理和异常标记由 clean_values 单次完成，峰值内存约为输入的一倍
+    :param df: 原始数据
+    :param numeric_cols: 数值列
+    :param categorical_cols: 类别列
+    :param inplace: 是否直接在传入的 df 上清洗（调用方不再需要原始数据时使用），默认 False
+    :param seen: 跨块 / 跨增量运行的行哈希集合，默认 None
+    :param background_save: 是否在后台线程保存快照，默认 False
     :return:清洗好的新数据集df_new
     """
     # print(f'清洗前：{df.shape}\n{df.info()}')
-    df_new = df.copy()
-    df_new = handle_missing_values(df_new, numeric_cols)
-    df_new = handle_categorical_missing(df_new, categorical_cols)
-    df_new = mark_abnormal_values(df_new)
-    df_new = remove_duplicates(df_new)
+    df_new = clean_values(df, numeric_cols, categorical_cols, inplace=inplace)
+    # 先在原始精度上去重，再压缩类型
+    df_new = remove_duplicates(df_new, seen=seen)
+    # 标志列 uint8、低基数字符串列 category；原始数值保持全精度，float32 只用于特征矩阵
+    df_new = compact_dtypes(df_new, categorical_cols, stage='数据清洗', inplace=True, floats=False)
     # print(f'清洗后：{df_new.shape}\n{df_new.info()}')
-    save_clean_data(df_new, config.DF_NEW_PATH)
+    save_clean_data(
+        df_new,
+        config.DF_NEW_PATH,
+        compression=config.CLEAN_DATA_COMPRESSION,
+        partition_col=config.CLEAN_DATA_PARTITION_COL,
+        background=background_save
+    )
     return df_new
 
+
+def clean_chunks(
+        chunks,
+        numeric_cols: list,
+        categorical_cols: list,
+        seen: RowHashSet | BloomRowHashSet | None = None
+):
+    """
+    分块清洗，用于超出内存的数据
+    每块在原地完成缺失值处理和异常标记，并借助 seen 跨块去重；不保存快照
+    :param chunks: 原始数据块迭代器（如 data_loader.iter_raw_chunks）
+    :param numeric_cols: 数值列
+    :param categorical_cols: 类别列
+    :param seen: 跨块行哈希集合，默认按 config.DEDUP_MEMORY_MB 新建（见 make_row_hash_set）
+    :return: 逐块产出清洗后的数据
+    """
+    seen = make_row_hash_set() if seen is None else seen
+    for chunk in chunks:
+        chunk = clean_values(chunk, numeric_cols, categorical_cols, inplace=True)
+        chunk = remove_duplicates(chunk, seen=seen)
+        # 块内唯一值占比不稳定，类别列沿用读取时的类型方案，只压缩标志列
+        yield compact_dtypes(chunk, categorical_cols=[], inplace=True, floats=False)
+
+
 if __name__ == '__main__':
     numeric_cols, categorical_cols = split_columns_clean(data_loader.load_raw_data())
     data_clean(data_loader.load_raw_data(), numeric_cols, categorical_cols)
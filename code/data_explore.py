@@ -1,21 +1,64 @@
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import pandas as pd
 
 import config
 import data_loader
+from data_stats import (
+    DatasetStats,
+    GroupCube,
+    approximate_stats,
+    correlation_pairs,
+    filter_strong_pairs,
+    kendall_corr,
+    sampled_corr,
+    spearman_corr
+)
 
 
-def explore_missing_values(df: pd.DataFrame) -> pd.DataFrame:
+def _map_columns(df: pd.DataFrame, func, workers: int | None = None) -> list:
+    """
+    按列切分 DataFrame，在线程池中对每一块列执行 func（内部函数）
+    线程共享同一份数据，不会为每个任务复制或序列化 DataFrame；
+    只用于数值列（isnull / describe 的主要开销在 numpy 里），字符串列的计数持有 GIL，不走线程池；
+    结果按列的原始顺序返回，与串行执行一致
+    :param df: 输入数据
+    :param func: 作用于列子集 DataFrame 的函数
+    :param workers: 线程数，默认 config.EDA_WORKERS，未设置时为 CPU 核数
+    :return: 各列块的结果列表（按列顺序）
+    """
+    workers = min(workers or config.EDA_WORKERS or os.cpu_count() or 1, max(df.shape[1], 1))
+    if workers == 1:
+        return [func(df)]
+    blocks = np.array_split(np.arange(df.shape[1]), workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda block: func(df.iloc[:, block]), blocks))
+
+
+def explore_missing_values(
+        df: pd.DataFrame | None = None,
+        stats: DatasetStats | None = None,
+        workers: int | None = None
+) -> pd.DataFrame:
     """
     统计各字段缺失率
+    :param df: 原始数据，传入 stats 时可以为 None
+    :param stats: 已累积的统计状态，传入后直接读取缺失数量，不再扫描 df
+    :param workers: 按列并行统计的线程数，默认 config.EDA_WORKERS
     :return:DataFrame，包含每个字段的缺失数量和缺失率，按缺失率降序排列
     """
-    # 计算每列的缺失值数量
-    missing_count = df.isnull().sum()
+    if stats is not None:
+        missing_count = stats.missing_counts()
+        num_rows = stats.num_rows
+    else:
+        # 计算每列的缺失值数量
+        missing_count = pd.concat(_map_columns(df, lambda block: block.isnull().sum(), workers))
+        num_rows = len(df)
     # 计算每列的缺失值比率
-    missing_rate = missing_count / len(df)
+    missing_rate = missing_count / num_rows
     # print(missing_rate)
     # print(missing_count)
     # 创建包含缺失值数量和缺失率的DataFrame，并按缺失率降序排列
@@ -23,9 +66,9 @@ def explore_missing_values(df: pd.DataFrame) -> pd.DataFrame:
         'missing_count': missing_count,
         'missing_rate': missing_rate
     }).sort_values(by='missing_rate', ascending=False)
-    # 添加缺失值模式分析
+    # 添加缺失值模式分析（按排序后的行顺序）
     missing_pattern = []
-    for col in df.columns:
+    for col in result.index:
         if missing_rate[col] > 0:
             if missing_rate[col] > 0.5:
                 pattern = "大量缺失"
@@ -40,40 +83,55 @@ def explore_missing_values(df: pd.DataFrame) -> pd.DataFrame:
     return result
 
 
-def explore_numeric_features(df: pd.DataFrame) -> pd.DataFrame:
+def explore_numeric_features(
+        df: pd.DataFrame | None = None,
+        stats: DatasetStats | None = None,
+        workers: int | None = None
+) -> pd.DataFrame:
     """
     分析数值型特征的描述性统计
-    :param df:输入原始的数据集
+    数据在内存中时始终精确计算；只有流式 / 分块输入（df 为 None）才使用 stats，
+    此时分位数来自草图，是近似值（结果的 attrs["approximate"] 列出近似列）
+    :param df:输入原始的数据集，传入 stats 时可以为 None
+    :param stats: 已累积的统计状态，df 为 None 时由 Welford 累积量和分位数草图生成结果
+    :param workers: 按列并行统计的线程数，默认 config.EDA_WORKERS
     :return:DataFrame，包含各数值型特征的统计量（计数、均值、标准差、最小值、25%、50%、75%、最大值）
     """
-    # 选择数据框中的数值型列（整数和浮点数类型）
-    numeric_df = df.select_dtypes(include=["int64", "float64"])
-    return numeric_df.describe().T
+    if df is None:
+        return stats.describe()
+    # 选择数据框中的数值型列（包括降精度后的整数和浮点数类型）
+    numeric_df = df.select_dtypes(include=[np.number])
+    return pd.concat(_map_columns(numeric_df, lambda block: block.describe().T, workers))
 
 
-def explore_categorical_features(df: pd.DataFrame, top_n: int = 10) -> dict:
+def explore_categorical_features(
+        df: pd.DataFrame | None = None,
+        top_n: int = 10,
+        stats: DatasetStats | None = None
+) -> dict:
     """
     分析类别型特征的分布情况
-    :param df:输入原始的数据集
+    逐列串行统计：字符串列的计数在持有 GIL 的哈希表里完成，多线程没有加速；
+    category 列的 value_counts 直接对整数编码计数，本身已经很快
+    :param df:输入原始的数据集，传入 stats 时可以为 None
     :param top_n:int，显示每个类别的前N个值，默认显示前10个
+    :param stats: 已累积的统计状态，传入后由高频取值统计生成结果
     :return:字典，键为类别型列名，值为该列的值分布Series
     """
-    result = {}
+    if stats is not None:
+        return stats.top(top_n)
     # 识别类别型列（字符串类型或分类类型）
-    cat_cols = df.select_dtypes(include=['object', 'category']).columns
-
-    for col in cat_cols:
-        # 统计每个值的出现次数（包括NaN）
-        value_counts = df[col].value_counts(dropna=False)
-        result[col] = value_counts.head(top_n)
-    return result
+    cat_df = df.select_dtypes(include=['object', 'category'])
+    # 统计每个值的出现次数（包括NaN）
+    return {col: cat_df[col].value_counts(dropna=False).head(top_n) for col in cat_df.columns}
 
 
 def analyze_feature_by_group(
         df: pd.DataFrame,
         group_col: str,
         feature_col: str,
-        normalize: bool = True
+        normalize: bool = True,
+        cube: GroupCube | None = None
 ) -> pd.DataFrame:
     """
     分析某个特征在不同分组中的分布
@@ -81,55 +139,71 @@ def analyze_feature_by_group(
     :param group_col:str，分组列名（如'lifecycle'）
     :param feature_col:str，要分析的特征列名
     :param normalize:bool，是否计算比例而不是计数，默认为True（计算比例）
+    :param cube: 预先构建的分组计数立方体（见 data_stats.load_group_cube），
+        传入后直接由计数矩阵生成交叉表；高基数数值特征为分箱后的分布
     :return:DataFrame，交叉表显示特征在不同分组中的分布
     """
+    if cube is not None and cube.group_col == group_col and feature_col in cube.counts:
+        return cube.crosstab(feature_col, normalize=normalize)
     if normalize:
         return pd.crosstab(df[group_col], df[feature_col], normalize='index')
     else:
         return pd.crosstab(df[group_col], df[feature_col])
 
 
-def explore_correlation(df: pd.DataFrame, method: str = 'pearson', threshold: float = 0.7) -> pd.DataFrame:
+def explore_correlation(
+        df: pd.DataFrame | None = None,
+        method: str = 'pearson',
+        threshold: float = 0.7,
+        stats: DatasetStats | None = None,
+        workers: int | None = None,
+        sample: int | None = None
+) -> pd.DataFrame:
     """
     分析数值特征之间的相关性
-    :param df:DataFrame，原始数据
+    - 传入 stats 且 method 为 pearson 时直接由协方差累积量得到，不再扫描数据
+    - 传入 sample，或数据行数超过 config.CORR_SAMPLE_THRESHOLD 时，抽样估计（见 data_stats.sampled_corr），
+      强相关特征对附带置信区间 lower / upper
+    - 否则在全量数据上精确计算
+    :param df:DataFrame，原始数据，传入 stats 且 method 为 pearson 时可以为 None
     :param method: 相关系数计算方法 ('pearson', 'spearman', 'kendall'),默认 pearson
     :param threshold: 相关性阈值，用于筛选强相关特征对
+    :param stats: 已累积的统计状态，pearson 相关性直接由协方差累积量得到
+    :param workers: kendall 并行计算特征对的进程数，默认 CPU 核数
+    :param sample: 抽样行数，默认 None（超过阈值时使用 config.CORR_SAMPLE_SIZE）
     :return:
         corr_matrix : 相关性矩阵
         strong_corr : 强相关特征对（DataFrame）
     """
-    # 1. 只保留数值型列（int、float）
-    numeric_df = df.select_dtypes(include=[np.number])
-    # 2. 计算相关性矩阵
-    corr_matrix = numeric_df.corr(method=method)
-    # 3. 用列表保存强相关结果
-    strong_corr_list = []
-    # 4. 两层 for 循环，逐个比较特征之间的相关性
-    columns = corr_matrix.columns
-    for i in range(len(columns)):
-        for j in range(i + 1, len(columns)):
-            feature_1 = columns[i]
-            feature_2 = columns[j]
-            corr_value = corr_matrix.loc[feature_1, feature_2]
-            # 5. 如果相关性绝对值大于阈值，就保存
-            if abs(corr_value) >= threshold:
-                strong_corr_list.append([
-                    feature_1,
-                    feature_2,
-                    corr_value,
-                    abs(corr_value)
-                ])
-    # 6. 转成 DataFrame，方便查看
-    strong_corr = pd.DataFrame(
-        strong_corr_list,
-        columns=['feature1', 'feature2', 'correlation', 'abs_correlation']
-    )
-    # 7. 按绝对相关性从大到小排序
-    strong_corr = strong_corr.sort_values(
-        by='abs_correlation',
-        ascending=False
-    )
+    if sample is None and df is not None and len(df) > config.CORR_SAMPLE_THRESHOLD \
+            and not (stats is not None and method == 'pearson'):
+        sample = config.CORR_SAMPLE_SIZE
+    if sample:
+        numeric_df = df.select_dtypes(include=[np.number])
+        corr_matrix, lower, upper = sampled_corr(numeric_df, method, sample_size=sample, workers=workers)
+        strong_corr = filter_strong_pairs(correlation_pairs(corr_matrix), threshold)
+        rows = corr_matrix.index.get_indexer(strong_corr['feature1'])
+        cols = corr_matrix.columns.get_indexer(strong_corr['feature2'])
+        strong_corr = strong_corr.assign(lower=lower.to_numpy()[rows, cols], upper=upper.to_numpy()[rows, cols])
+        return corr_matrix, strong_corr
+    if stats is not None and method == 'pearson':
+        # 相关性矩阵和排好序的特征对都来自 stats 的缓存
+        corr_matrix = stats.corr()
+        pairs = stats.corr_pairs()
+    else:
+        # 1. 只保留数值型列（int、float）
+        numeric_df = df.select_dtypes(include=[np.number])
+        # 2. 计算相关性矩阵（spearman 只排一次秩，kendall 使用 O(n log n) 算法并行计算）
+        if method == 'spearman':
+            corr_matrix = spearman_corr(numeric_df)
+        elif method == 'kendall':
+            corr_matrix = kendall_corr(numeric_df, workers=workers)
+        else:
+            corr_matrix = numeric_df.corr(method=method)
+        # 3. 上三角掩码一次取出所有特征对，按绝对相关性从大到小排序
+        pairs = correlation_pairs(corr_matrix)
+    # 4. 在排好序的特征对上按阈值截取强相关部分
+    strong_corr = filter_strong_pairs(pairs, threshold)
     return corr_matrix, strong_corr
 
 
@@ -139,32 +213,40 @@ def split_columns_clean(df: pd.DataFrame):
     :param df: DataFrame原始数据
     :return: 数值列和类别列
     """
-    numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns.tolist()
-    categorical_cols = df.select_dtypes(include=["object"]).columns.tolist()
+    # 使用类型大类划分，分块读取后的 int8/float32/category 列同样适用
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    categorical_cols = df.select_dtypes(include=["object", "category"]).columns.tolist()
 
     return numeric_cols, categorical_cols
 
 
-def data_explore():
+def data_explore(sample: int | None = None):
     """
     展示所有探索的数据
+    :param sample: 抽样行数，设置后按 lifecycle 分层抽样做近似探索，结果附带置信区间
     :return:
     """
+    if sample:
+        explore_sample(sample)
+        return
     df = data_loader.load_raw_data()
+    # 一次扫描得到缺失、描述统计、类别分布和相关性所需的全部累积量
+    stats = DatasetStats.from_frame(df)
     print(f'统计各字段缺失率')
-    re = explore_missing_values(df)
+    re = explore_missing_values(df, stats=stats)
     print(re)
     print(f'分析数值型特征的描述性统计')
+    # 数据已在内存中，描述统计（含分位数）精确计算
     nd = explore_numeric_features(df)
     print(nd)
     print(f'分析类别型特征的分布情况')
-    result = explore_categorical_features(df)
+    result = explore_categorical_features(df, stats=stats)
     print(result)
     print(f'分析某个特征在不同分组中的分布')
     group = analyze_feature_by_group(df, 'lifecycle', 'age')
     print(group)
     print(f'分析数值特征之间的相关性')
-    correlation = explore_correlation(df, 'pearson', 0.7)
+    correlation = explore_correlation(df, 'pearson', 0.7, stats=stats)
     print(correlation)
     print(f'自动划分数值列和类别列')
     numeric_cols, categorical_cols = split_columns_clean(df)
@@ -172,6 +254,35 @@ def data_explore():
           f'类别列:{categorical_cols}')
 
 
+def explore_sample(sample_size: int, confidence: float = 0.95):
+    """
+    基于分层样本的近似探索，只扫描一遍原始数据，内存占用与样本大小成正比
+    :param sample_size: 抽样行数
+    :param confidence: 置信水平
+    :return:
+    """
+    sample, strata_counts = data_loader.load_raw_sample(sample_size, config.TARGET_COL)
+    approx = approximate_stats(sample, strata_counts, config.TARGET_COL, confidence)
+    print(f'近似探索：样本 {approx["num_samples"]} 行 / 全量 {approx["num_rows"]} 行，置信水平 {confidence:.0%}')
+    print(f'统计各字段缺失率')
+    print(approx["missing"])
+    print(f'分析数值型特征的描述性统计')
+    print(approx["numeric"])
+    print(f'分析类别型特征的分布情况')
+    for table in approx["categorical"].values():
+        print(table)
+    print(f'分析某个特征在不同分组中的分布（样本）')
+    print(analyze_feature_by_group(sample, 'lifecycle', 'age'))
+    print(f'分析数值特征之间的相关性')
+    corr, lower, upper = approx["correlation"]
+    pairs = filter_strong_pairs(correlation_pairs(corr), 0.7).copy()
+    rows = corr.index.get_indexer(pairs['feature1'])
+    cols = corr.columns.get_indexer(pairs['feature2'])
+    pairs['lower'] = lower.to_numpy()[rows, cols]
+    pairs['upper'] = upper.to_numpy()[rows, cols]
+    print(pairs)
+
+
 if __name__ == '__main__':
     data_explore()
     print(f'{time.time() - config.START:.2f}s')
@@ -0,0 +1,1125 @@
+"""
+单次扫描、可合并的统计引擎
+- 每个数据块只扫描一次，得到的累积量可以跨块 / 跨增量运行合并
+- data_explore 中的探索函数可以直接从累积状态生成原有格式的结果，无需重新扫描
+"""
+import copy
+import hashlib
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+import config
+import data_loader
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """
+    向量化计算 uint64 的有效位数（内部函数）
+    :param values: uint64 数组
+    :return: 每个元素的二进制位数，0 的位数为 0
+    """
+    x = values.copy()
+    length = np.zeros(len(x), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = x >= (np.uint64(1) << np.uint64(shift))
+        length[mask] += shift
+        x[mask] >>= np.uint64(shift)
+    return length + (x > 0)
+
+
+def _hash_values(values) -> np.ndarray:
+    """
+    计算取值的 64 位哈希，忽略缺失值（内部函数）
+    :param values: Series 或数组
+    :return: uint64 数组
+    """
+    series = pd.Series(values).dropna()
+    return pd.util.hash_pandas_object(series, index=False).to_numpy()
+
+
+def correlation_pairs(corr_matrix: pd.DataFrame) -> pd.DataFrame:
+    """
+    用一次上三角掩码取出所有特征对，按相关性绝对值降序排列
+    阈值变化时只需用 filter_strong_pairs 在排好序的结果上截取，无需重新遍历矩阵
+    :param corr_matrix: 相关性矩阵
+    :return: DataFrame，列为 feature1 / feature2 / correlation / abs_correlation
+    """
+    columns = np.asarray(corr_matrix.columns)
+    rows, cols = np.triu_indices(len(columns), k=1)
+    values = corr_matrix.to_numpy()[rows, cols]
+    keep = ~np.isnan(values)
+    rows, cols, values = rows[keep], cols[keep], values[keep]
+    order = np.argsort(-np.abs(values), kind="stable")
+    return pd.DataFrame({
+        'feature1': columns[rows[order]],
+        'feature2': columns[cols[order]],
+        'correlation': values[order],
+        'abs_correlation': np.abs(values[order])
+    })
+
+
+def filter_strong_pairs(pairs: pd.DataFrame, threshold: float) -> pd.DataFrame:
+    """
+    从按绝对值降序排列的特征对中截取强相关部分（二分查找）
+    :param pairs: correlation_pairs 的结果
+    :param threshold: 相关性阈值
+    :return: 绝对相关性不小于阈值的特征对
+    """
+    n = np.searchsorted(-pairs['abs_correlation'].to_numpy(), -threshold, side="right")
+    return pairs.iloc[:n]
+
+
+class HyperLogLog:
+    """
+    HyperLogLog 基数估计，用于统计各列不同取值个数
+    内存为 2^precision 字节，相对误差约 1.04 / sqrt(2^precision)
+    """
+
+    def __init__(self, precision: int = 14):
+        """
+        :param precision: 寄存器个数的对数，默认 14（16384 个寄存器，误差约 0.8%）
+        """
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values) -> None:
+        """
+        :param values: 一个数据块中某列的取值
+        """
+        hashes = _hash_values(values)
+        if len(hashes) == 0:
+            return
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        rest = hashes << p
+        # 前导零个数 + 1，rest 全为 0 时取上限
+        rank = np.where(rest == 0, 64 - self.precision + 1, 64 - _bit_length(rest) + 1)
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """
+        :param other: 另一个同精度的 HyperLogLog
+        """
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        """
+        :return: 不同取值个数的估计值
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(int)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # 小基数时使用线性计数修正
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class QuantileSketch:
+    """
+    KLL 风格的分位数草图
+    - 每层最多保留 k 个样本，满了就排序后隔一个保留、升到上一层（权重翻倍）
+    - 数据量不超过 k 时结果与精确分位数一致
+    - 秩误差约为 log2(n / k) / k
+    """
+
+    def __init__(self, k: int = 2048, seed: int = 0):
+        """
+        :param k: 每层容量
+        :param seed: 随机种子，保证结果可复现
+        """
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+
+    def _compress(self) -> None:
+        """
+        逐层压缩超出容量的层（内部方法）
+        """
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.k:
+                items = np.sort(items)
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                items = items[:len(items) - len(keep)]
+                promoted = items[self.rng.integers(2)::2]
+                self.levels[level] = keep
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values) -> None:
+        """
+        :param values: 一个数据块中某列的取值（缺失值会被忽略）
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """
+        :param other: 另一个草图
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    def quantile(self, q) -> np.ndarray:
+        """
+        :param q: 分位点（0~1），可以是列表
+        :return: 对应的分位数
+        """
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if len(self.levels) == 1:
+            if len(self.levels[0]) == 0:
+                return np.full(len(q), np.nan)
+            # 未发生压缩，直接给出精确分位数
+            return np.quantile(self.levels[0], q)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(level), 2.0 ** i) for i, level in enumerate(self.levels)
+        ])
+        order = np.argsort(items)
+        items, cum_weights = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cum_weights, q * cum_weights[-1], side="left")
+        return items[np.minimum(positions, len(items) - 1)]
+
+
+class TopK:
+    """
+    高频取值统计（heavy hitters），Space-Saving 算法的批量版本
+    - 最多保存 capacity 个取值，每个取值记录估计计数 count 和误差上界 error，真实计数在
+      [count - error, count] 之间
+    - floor 记录被淘汰取值的最大估计计数，不在表中的取值真实计数不超过 floor
+    - 新取值进入时继承 floor 作为起始计数和误差（逐条版本中即“替换最小项并继承其计数”），
+      合并两个 TopK 时双方缺失的取值各自补上对方的 floor
+    - 取值个数从未超过 capacity 时 floor 为 0，计数精确
+    """
+
+    def __init__(self, capacity: int = 1000):
+        """
+        :param capacity: 保留的取值个数上限
+        """
+        self.capacity = capacity
+        self.counts = pd.Series(dtype="int64")
+        self.errors = pd.Series(dtype="int64")
+        self.floor = 0
+
+    def _add(self, counts: pd.Series, errors: pd.Series, floor: int) -> None:
+        """
+        合并另一份计数并按容量淘汰（内部方法）
+        :param counts: 取值 -> 估计计数
+        :param errors: 取值 -> 误差上界
+        :param floor: 对方未记录取值的计数上界
+        """
+        counts = counts.copy()
+        counts.index = counts.index.astype(object)
+        errors = errors.copy()
+        errors.index = counts.index
+        index = self.counts.index.union(counts.index, sort=False)
+        merged = (self.counts.reindex(index, fill_value=self.floor)
+                  + counts.reindex(index, fill_value=floor)).astype("int64")
+        merged_errors = (self.errors.reindex(index, fill_value=self.floor)
+                         + errors.reindex(index, fill_value=floor)).astype("int64")
+        floor = self.floor + floor
+        if len(merged) > self.capacity:
+            merged = merged.sort_values(ascending=False, kind="stable")
+            # 淘汰项的计数上界并入 floor
+            floor = max(floor, int(merged.iloc[self.capacity]))
+            merged = merged.iloc[:self.capacity]
+        self.counts = merged
+        self.errors = merged_errors.reindex(merged.index)
+        self.floor = floor
+
+    def update(self, values) -> None:
+        """
+        :param values: 一个数据块中某列的取值（缺失值单独计数）
+        """
+        counts = pd.Series(values).value_counts(dropna=False)
+        self._add(counts, pd.Series(0, index=counts.index, dtype="int64"), 0)
+
+    def merge(self, other: "TopK") -> None:
+        """
+        :param other: 另一个 TopK
+        """
+        self._add(other.counts, other.errors, other.floor)
+
+    def top(self, n: int) -> pd.Series:
+        """
+        :param n: 返回前 n 个取值
+        :return: 按估计计数降序排列的 Series（误差见 self.errors）
+        """
+        return self.counts.sort_values(ascending=False, kind="stable").head(n)
+
+
+class DatasetStats:
+    """
+    数据集统计量的累积状态，一次扫描同时得到：
+    - 各列缺失数量、HyperLogLog 不同取值数
+    - 数值列：Welford 均值 / 方差、最值、分位数草图、成对完整观测的协方差累积量
+    - 类别列：高频取值
+    各部分都可以逐块 update，也可以用 merge 合并两个状态
+    """
+
+    def __init__(
+            self,
+            sketch_size: int | None = None,
+            top_capacity: int | None = None,
+            hll_precision: int | None = None
+    ):
+        """
+        :param sketch_size: 分位数草图每层容量，默认 config.STATS_SKETCH_SIZE
+        :param top_capacity: 高频取值保留个数，默认 config.STATS_TOP_CAPACITY
+        :param hll_precision: HyperLogLog 精度，默认 config.STATS_HLL_PRECISION
+        """
+        self.sketch_size = sketch_size or config.STATS_SKETCH_SIZE
+        self.top_capacity = top_capacity or config.STATS_TOP_CAPACITY
+        self.hll_precision = hll_precision or config.STATS_HLL_PRECISION
+        self.num_rows = 0
+        self.columns = None
+        # 相关性矩阵和排好序的特征对缓存，数据更新后失效
+        self._corr_cache = None
+
+    def _init_columns(self, df: pd.DataFrame) -> None:
+        """
+        根据第一个数据块确定列和各累积量（内部方法）
+        :param df: 第一个数据块
+        """
+        self.columns = list(df.columns)
+        self.numeric_cols = [
+            col for col in df.columns
+            if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])
+        ]
+        self.categorical_cols = [
+            col for col in df.columns
+            if pd.api.types.is_object_dtype(df[col])
+            or pd.api.types.is_string_dtype(df[col])
+            or isinstance(df[col].dtype, pd.CategoricalDtype)
+        ]
+        p = len(self.numeric_cols)
+        self.null_counts = np.zeros(len(self.columns), dtype=np.int64)
+        self.distinct = {col: HyperLogLog(self.hll_precision) for col in self.columns}
+        # Welford 累积量
+        self.count = np.zeros(p)
+        self.mean = np.zeros(p)
+        self.m2 = np.zeros(p)
+        self.min = np.full(p, np.nan)
+        self.max = np.full(p, np.nan)
+        self.sketches = [QuantileSketch(self.sketch_size, seed=i) for i in range(p)]
+        self.top_values = {col: TopK(self.top_capacity) for col in self.categorical_cols}
+        # 成对完整观测的累积量（以 shift 平移，减少数值误差）
+        self.shift = None
+        self.pair_n = np.zeros((p, p))
+        self.pair_sum = np.zeros((p, p))
+        self.pair_sq = np.zeros((p, p))
+        self.pair_prod = np.zeros((p, p))
+
+    def _merge_moments(self, count, mean, m2, vmin, vmax) -> None:
+        """
+        Chan / Welford 方式合并均值与平方和（内部方法）
+        """
+        total = self.count + count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = np.where(count > 0, mean, 0) - self.mean
+            ratio = np.where(total > 0, count / total, 0)
+            self.mean = np.where(count > 0, self.mean + delta * ratio, self.mean)
+            self.m2 = self.m2 + np.where(count > 0, m2 + delta ** 2 * self.count * ratio, 0)
+        self.count = total
+        self.min = np.fmin(self.min, vmin)
+        self.max = np.fmax(self.max, vmax)
+
+    def update(self, df: pd.DataFrame) -> "DatasetStats":
+        """
+        扫描一个数据块并累积统计量
+        :param df: 数据块
+        :return: self
+        """
+        if self.columns is None:
+            self._init_columns(df)
+        self._corr_cache = None
+        self.num_rows += len(df)
+        self.null_counts += df[self.columns].isnull().sum().to_numpy()
+        for col in self.columns:
+            self.distinct[col].update(df[col])
+        for col in self.categorical_cols:
+            self.top_values[col].update(df[col])
+        if not self.numeric_cols or len(df) == 0:
+            return self
+
+        x = df[self.numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(x)
+        count = present.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.nansum(x, axis=0) / count
+            m2 = np.nansum((x - mean) ** 2, axis=0)
+        # 全缺失的列在本块没有最值
+        vmin = np.where(count > 0, np.nanmin(np.where(present, x, np.inf), axis=0), np.nan)
+        vmax = np.where(count > 0, np.nanmax(np.where(present, x, -np.inf), axis=0), np.nan)
+        self._merge_moments(count, mean, m2, vmin, vmax)
+        for i, sketch in enumerate(self.sketches):
+            sketch.update(x[:, i])
+
+        if self.shift is None:
+            self.shift = np.nan_to_num(mean)
+        y = np.where(present, x - self.shift, 0.0)
+        m = present.astype(np.float64)
+        self.pair_n += m.T @ m
+        self.pair_sum += y.T @ m
+        self.pair_sq += (y ** 2).T @ m
+        self.pair_prod += y.T @ y
+        return self
+
+    def merge(self, other: "DatasetStats") -> "DatasetStats":
+        """
+        合并另一个统计状态（两者列结构需一致）
+        :param other: 另一个 DatasetStats
+        :return: self
+        """
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.__dict__.update(copy.deepcopy(other.__dict__))
+            return self
+        if self.columns != other.columns:
+            raise ValueError("合并的统计状态列结构不一致")
+        self._corr_cache = None
+        self.num_rows += other.num_rows
+        self.null_counts += other.null_counts
+        for col in self.columns:
+            self.distinct[col].merge(other.distinct[col])
+        for col in self.categorical_cols:
+            self.top_values[col].merge(other.top_values[col])
+        self._merge_moments(other.count, other.mean, other.m2, other.min, other.max)
+        for sketch, other_sketch in zip(self.sketches, other.sketches):
+            sketch.merge(other_sketch)
+        if other.shift is not None:
+            if self.shift is None:
+                self.shift = other.shift
+            else:
+                # 把对方的累积量换算到本方的平移量后相加
+                d = (other.shift - self.shift)[:, None]
+                d_t = d.T
+                self.pair_prod += (other.pair_prod + d_t * other.pair_sum + d * other.pair_sum.T
+                                   + d * d_t * other.pair_n)
+                self.pair_sq += other.pair_sq + 2 * d * other.pair_sum + d ** 2 * other.pair_n
+                self.pair_sum += other.pair_sum + d * other.pair_n
+                self.pair_n += other.pair_n
+                return self
+        self.pair_n += other.pair_n
+        self.pair_sum += other.pair_sum
+        self.pair_sq += other.pair_sq
+        self.pair_prod += other.pair_prod
+        return self
+
+    @classmethod
+    def from_chunks(cls, chunks, **kwargs) -> "DatasetStats":
+        """
+        逐块扫描构建统计状态
+        :param chunks: 数据块迭代器（如 data_loader.iter_raw_chunks）
+        :return: DatasetStats
+        """
+        stats = cls(**kwargs)
+        start = time.time()
+        for chunk in chunks:
+            stats.update(chunk)
+        print(f"统计量扫描完成：{stats.num_rows} 行，耗时 {time.time() - start:.2f}s")
+        return stats
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, chunksize: int | None = None, **kwargs) -> "DatasetStats":
+        """
+        对已加载的数据构建统计状态
+        :param df: DataFrame
+        :param chunksize: 分块行数，默认 config.CHUNK_SIZE
+        :return: DatasetStats
+        """
+        chunksize = chunksize or config.CHUNK_SIZE
+        return cls.from_chunks(
+            (df.iloc[i:i + chunksize] for i in range(0, max(len(df), 1), chunksize)),
+            **kwargs
+        )
+
+    def missing_counts(self) -> pd.Series:
+        """
+        :return: 各列缺失数量
+        """
+        return pd.Series(self.null_counts, index=self.columns)
+
+    def distinct_counts(self) -> pd.Series:
+        """
+        :return: 各列不同取值个数（HyperLogLog 估计值）
+        """
+        return pd.Series({col: self.distinct[col].count() for col in self.columns})
+
+    def describe(self) -> pd.DataFrame:
+        """
+        :return: 与 DataFrame.describe().T 格式一致的数值列统计量；分位数来自草图，是近似值，
+            列名记录在 attrs["approximate"] 中
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(self.m2 / (self.count - 1))
+            std = np.where(self.count > 1, std, np.nan)
+        quantiles = np.array([
+            sketch.quantile([0.25, 0.5, 0.75]) for sketch in self.sketches
+        ]).reshape(len(self.sketches), 3)
+        result = pd.DataFrame({
+            "count": self.count,
+            "mean": np.where(self.count > 0, self.mean, np.nan),
+            "std": std,
+            "min": self.min,
+            "25%": quantiles[:, 0],
+            "50%": quantiles[:, 1],
+            "75%": quantiles[:, 2],
+            "max": self.max
+        }, index=self.numeric_cols)
+        result.attrs["approximate"] = ["25%", "50%", "75%"]
+        return result
+
+    def top(self, top_n: int = 10) -> dict:
+        """
+        :param top_n: 每列返回的取值个数
+        :return: {类别列名: 按计数降序的取值分布 Series}
+        """
+        result = {}
+        for col in self.categorical_cols:
+            counts = self.top_values[col].top(top_n)
+            counts.index.name = col
+            result[col] = counts.rename("count")
+        return result
+
+    def _pair_moments(self):
+        """
+        计算成对完整观测的中心化叉积与平方和（内部方法）
+        :return: (观测数, 叉积, x 平方和, y 平方和)
+        """
+        n = self.pair_n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cross = self.pair_prod - self.pair_sum * self.pair_sum.T / n
+            sq_x = self.pair_sq - self.pair_sum ** 2 / n
+        return n, cross, sq_x, sq_x.T
+
+    def cov(self) -> pd.DataFrame:
+        """
+        :return: 协方差矩阵（成对完整观测，与 DataFrame.cov 一致）
+        """
+        n, cross, _, _ = self._pair_moments()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = np.where(n > 1, cross / (n - 1), np.nan)
+        return pd.DataFrame(cov, index=self.numeric_cols, columns=self.numeric_cols)
+
+    def corr(self) -> pd.DataFrame:
+        """
+        :return: Pearson 相关系数矩阵（成对完整观测，与 DataFrame.corr 一致）
+        """
+        if self._corr_cache is None:
+            corr_matrix = self._compute_corr()
+            self._corr_cache = (corr_matrix, correlation_pairs(corr_matrix))
+        return self._corr_cache[0]
+
+    def corr_pairs(self) -> pd.DataFrame:
+        """
+        :return: 按绝对值降序排列的全部特征对，结果被缓存，阈值变化时直接截取
+        """
+        self.corr()
+        return self._corr_cache[1]
+
+    def _compute_corr(self) -> pd.DataFrame:
+        """
+        由协方差累积量计算相关系数矩阵（内部方法）
+        :return: 相关系数矩阵
+        """
+        n, cross, sq_x, sq_y = self._pair_moments()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            denom = np.sqrt(sq_x * sq_y)
+            corr = np.where((n > 1) & (denom > 0), cross / denom, np.nan)
+        corr = np.clip(corr, -1, 1)
+        diagonal = np.diag(corr).copy()
+        np.fill_diagonal(corr, np.where(np.isnan(diagonal), np.nan, 1.0))
+        return pd.DataFrame(corr, index=self.numeric_cols, columns=self.numeric_cols)
+
+
+def _rank_average(values: np.ndarray) -> np.ndarray:
+    """
+    平均秩（并列取平均，与 DataFrame.rank 默认方式一致）（内部函数）
+    :param values: 不含缺失值的一维数组
+    :return: 从 1 开始的秩
+    """
+    order = np.argsort(values, kind="mergesort")
+    sorted_values = values[order]
+    # 每段并列值的起止位置
+    starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+    ends = np.r_[starts[1:], len(values)]
+    average = (starts + ends + 1) / 2.0
+    ranks = np.empty(len(values))
+    ranks[order] = np.repeat(average, ends - starts)
+    return ranks
+
+
+def _pearson_matrix(x: np.ndarray) -> np.ndarray:
+    """
+    无缺失值矩阵的 Pearson 相关系数（内部函数）
+    :param x: 形状为 (行数, 列数) 的矩阵
+    :return: 相关系数矩阵，常数列对应 NaN
+    """
+    centered = x - x.mean(axis=0)
+    cross = centered.T @ centered
+    norm = np.sqrt(np.diag(cross))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = cross / np.outer(norm, norm)
+    return np.clip(corr, -1, 1)
+
+
+def _pearson_pair(x: np.ndarray, y: np.ndarray) -> float:
+    """
+    两个向量的 Pearson 相关系数（内部函数）
+    """
+    if len(x) < 2:
+        return np.nan
+    return _pearson_matrix(np.column_stack([x, y]))[0, 1]
+
+
+def spearman_corr(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Spearman 相关系数：先对每列只排一次秩，再对秩做一次矩阵 Pearson
+    含缺失值的列与其他列组成的特征对，按成对完整观测重新排秩，结果与 DataFrame.corr(method='spearman') 一致
+    :param df: 数值型 DataFrame
+    :return: 相关系数矩阵
+    """
+    mat = df.to_numpy(dtype=np.float64, na_value=np.nan)
+    columns = df.columns
+    present = ~np.isnan(mat)
+    complete = present.all(axis=0)
+    corr = np.full((len(columns), len(columns)), np.nan)
+    # 无缺失值的列：一次排秩 + 一次矩阵乘法
+    idx = np.flatnonzero(complete)
+    if len(idx) and len(mat) > 1:
+        ranks = np.column_stack([_rank_average(mat[:, i]) for i in idx])
+        corr[np.ix_(idx, idx)] = _pearson_matrix(ranks)
+    # 含缺失值的特征对：只在成对完整观测上计算
+    for i in range(len(columns)):
+        for j in range(i, len(columns)):
+            if complete[i] and complete[j]:
+                continue
+            valid = present[:, i] & present[:, j]
+            if i == j:
+                value = 1.0 if valid.sum() > 1 else np.nan
+            else:
+                value = _pearson_pair(_rank_average(mat[valid, i]), _rank_average(mat[valid, j]))
+            corr[i, j] = corr[j, i] = value
+    np.fill_diagonal(corr, np.where(np.isnan(np.diag(corr)), np.nan, 1.0))
+    return pd.DataFrame(corr, index=columns, columns=columns)
+
+
+def _count_inversions(values: np.ndarray) -> int:
+    """
+    统计逆序对个数（i < j 且 values[i] > values[j]），自底向上归并，每一轮整体向量化（内部函数）
+    :param values: 一维数组
+    :return: 逆序对个数
+    """
+    n = len(values)
+    # 转为 0..n-1 的稠密秩，便于用 “块编号 * n + 秩” 构造全局有序键
+    a = np.unique(values, return_inverse=True)[1].astype(np.int64)
+    positions = np.arange(n)
+    inversions = 0
+    width = 1
+    while width < n:
+        pair_id = positions // (2 * width)
+        offset = positions - pair_id * (2 * width)
+        keys = pair_id * n + a
+        # 稳定排序完成归并：左右块各自有序，timsort 按段归并接近线性；键相同时左块在前
+        order = np.argsort(keys, kind="stable")
+        merged_pos = np.empty(n, dtype=np.int64)
+        merged_pos[order] = offset
+        # 右块元素：归并后在本对中的位置 - 在右块中的位置 = 排在它前面的左块元素个数，
+        # 左块其余元素都比它大
+        right = offset >= width
+        left_before = merged_pos[right] - (offset[right] - width)
+        inversions += int((width - left_before).sum())
+        a = keys[order] - pair_id * n
+        width *= 2
+    return inversions
+
+
+def _tie_pairs(sorted_values: np.ndarray, boundaries: np.ndarray | None = None) -> int:
+    """
+    统计有序数组中并列值构成的对数 sum(t * (t - 1) / 2)（内部函数）
+    :param sorted_values: 已排序的数组
+    :param boundaries: 额外的分段边界（用于联合并列），默认 None
+    :return: 并列对数
+    """
+    change = np.r_[True, sorted_values[1:] != sorted_values[:-1]]
+    if boundaries is not None:
+        change |= boundaries
+    counts = np.diff(np.r_[np.flatnonzero(change), len(sorted_values)])
+    return int((counts * (counts - 1) // 2).sum())
+
+
+def kendall_tau_b(x: np.ndarray, y: np.ndarray) -> float:
+    """
+    Kendall tau-b，Knight 算法，O(n log n)
+    1. 按 (x, y) 排序，统计 x 并列对数和 (x, y) 联合并列对数
+    2. y 在该顺序下的逆序对个数即为不一致对数
+    3. 统计 y 并列对数，按 tau-b 公式修正并列
+    :param x: 不含缺失值的一维数组
+    :param y: 不含缺失值的一维数组
+    :return: tau-b
+    """
+    n = len(x)
+    if n < 2:
+        return np.nan
+    order = np.lexsort((y, x))
+    x, y = x[order], y[order]
+    x_change = np.r_[True, x[1:] != x[:-1]]
+    ties_x = _tie_pairs(x)
+    ties_xy = _tie_pairs(y, boundaries=x_change)
+    discordant = _count_inversions(y)
+    ties_y = _tie_pairs(np.sort(y))
+    total = n * (n - 1) // 2
+    denom = np.sqrt(float(total - ties_x) * float(total - ties_y))
+    if denom == 0:
+        return np.nan
+    return (total - ties_x - ties_y + ties_xy - 2 * discordant) / denom
+
+
+# 进程池中各 worker 共享的数值矩阵（通过 initializer 每个进程只传一次）
+_WORKER_MATRIX = None
+
+
+def _init_kendall_worker(mat: np.ndarray) -> None:
+    """
+    进程池初始化：保存数值矩阵（内部函数）
+    """
+    global _WORKER_MATRIX
+    _WORKER_MATRIX = mat
+
+
+def _kendall_pair(pair: tuple) -> float:
+    """
+    计算一对列的 tau-b，只使用成对完整观测（内部函数）
+    :param pair: (列下标 i, 列下标 j)
+    """
+    i, j = pair
+    x, y = _WORKER_MATRIX[:, i], _WORKER_MATRIX[:, j]
+    valid = ~(np.isnan(x) | np.isnan(y))
+    return kendall_tau_b(x[valid], y[valid])
+
+
+def kendall_corr(df: pd.DataFrame, workers: int | None = None) -> pd.DataFrame:
+    """
+    Kendall tau-b 相关系数矩阵
+    每对列使用 O(n log n) 的 kendall_tau_b，特征对在进程池中并行计算
+    :param df: 数值型 DataFrame
+    :param workers: 进程数，默认 CPU 核数；为 1 时在当前进程串行计算
+    :return: 相关系数矩阵
+    """
+    mat = df.to_numpy(dtype=np.float64, na_value=np.nan)
+    k = mat.shape[1]
+    pairs = [(i, j) for i in range(k) for j in range(i + 1, k)]
+    workers = min(workers or os.cpu_count() or 1, max(len(pairs), 1))
+    if workers == 1:
+        _init_kendall_worker(mat)
+        values = [_kendall_pair(pair) for pair in pairs]
+    else:
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_kendall_worker,
+                initargs=(mat,)
+        ) as executor:
+            values = list(executor.map(_kendall_pair, pairs, chunksize=max(1, len(pairs) // (4 * workers))))
+    corr = np.eye(k)
+    for (i, j), value in zip(pairs, values):
+        corr[i, j] = corr[j, i] = value
+    # 有效观测少于 2 行的列，对角线也记为缺失
+    enough = (~np.isnan(mat)).sum(axis=0) > 1
+    corr[np.diag_indices(k)] = np.where(enough, 1.0, np.nan)
+    return pd.DataFrame(corr, index=df.columns, columns=df.columns)
+
+
+def sampled_corr(
+        df: pd.DataFrame,
+        method: str = 'pearson',
+        sample_size: int = 100_000,
+        confidence: float = 0.95,
+        random_state: int = 123,
+        workers: int | None = None
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    抽样估计相关系数，并用 Fisher z 变换给出置信区间
+    标准误：pearson 1/sqrt(n-3)，spearman sqrt(1.06/(n-3))，kendall sqrt(0.437/(n-4))
+    :param df: 数值型 DataFrame
+    :param method: 'pearson' / 'spearman' / 'kendall'
+    :param sample_size: 抽样行数，数据不足时使用全部数据
+    :param confidence: 置信水平
+    :param random_state: 随机种子
+    :param workers: kendall 的并行进程数
+    :return: (估计值, 置信下限, 置信上限) 三个矩阵
+    """
+    sample = df.sample(n=min(sample_size, len(df)), random_state=random_state)
+    if method == 'pearson':
+        corr = sample.corr()
+        se_scale, offset = 1.0, 3
+    elif method == 'spearman':
+        corr = spearman_corr(sample)
+        se_scale, offset = 1.06, 3
+    elif method == 'kendall':
+        corr = kendall_corr(sample, workers=workers)
+        se_scale, offset = 0.437, 4
+    else:
+        raise ValueError(f"不支持的相关系数方法: {method}")
+    present = sample.notna().to_numpy(dtype=np.float64)
+    lower, upper = _fisher_interval(corr, present.T @ present, se_scale, offset, confidence)
+    return corr, lower, upper
+
+
+def _fisher_interval(
+        corr: pd.DataFrame,
+        n: np.ndarray,
+        se_scale: float,
+        offset: int,
+        confidence: float
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Fisher z 变换的相关系数置信区间（内部函数）
+    :param corr: 相关系数矩阵
+    :param n: 每对特征的有效样本数
+    :param se_scale: 标准误系数
+    :param offset: 样本数修正项
+    :param confidence: 置信水平
+    :return: (置信下限, 置信上限)
+    """
+    z_crit = NormalDist().inv_cdf(0.5 + confidence / 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        se = np.sqrt(se_scale / (n - offset))
+        z = np.arctanh(np.clip(corr.to_numpy(), -0.999999, 0.999999))
+        lower = np.tanh(z - z_crit * se)
+        upper = np.tanh(z + z_crit * se)
+    np.fill_diagonal(lower, np.diag(corr))
+    np.fill_diagonal(upper, np.diag(corr))
+    return (
+        pd.DataFrame(lower, index=corr.index, columns=corr.columns),
+        pd.DataFrame(upper, index=corr.index, columns=corr.columns)
+    )
+
+
+def _stratified_estimate(
+        values: pd.DataFrame,
+        strata: np.ndarray,
+        strata_counts: pd.Series
+) -> tuple[pd.Series, pd.Series]:
+    """
+    分层抽样下各列均值（或比例）的估计值和标准误（内部函数）
+    均值 = sum(W_h * 均值_h)，方差 = sum(W_h^2 * (1 - n_h / N_h) * s_h^2 / n_h)
+    :param values: 样本中要估计的列（比例估计传 0/1 指示列）
+    :param strata: 每行的分层标签
+    :param strata_counts: 各分层在全量数据中的行数
+    :return: (估计值, 标准误)
+    """
+    grouped = values.groupby(strata, dropna=False)
+    mean_h = grouped.mean()
+    var_h = grouped.var(ddof=1).fillna(0)
+    n_h = grouped.count()
+    big_n = strata_counts.reindex(mean_h.index).to_numpy(dtype=np.float64)[:, None]
+    weight = big_n / strata_counts.sum()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fpc = np.clip(1 - n_h / big_n, 0, 1)
+        var = (weight ** 2 * fpc * var_h / n_h.where(n_h > 0)).sum()
+    return (weight * mean_h).sum(), np.sqrt(var)
+
+
+def _weighted_std(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    按抽样权重（每行代表的全量行数）估计各列总体标准差，忽略缺失值（内部函数）
+    :param values: 形状为 (行数, 列数) 的 float64 数组
+    :param weights: 每行的权重
+    :return: 各列标准差
+    """
+    present = ~np.isnan(values)
+    w = np.where(present, weights[:, None], 0.0)
+    x = np.where(present, values, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        total = w.sum(axis=0)
+        mean = (w * x).sum(axis=0) / total
+        var = (w * (x - mean) ** 2).sum(axis=0) / total
+        n = present.sum(axis=0)
+        return np.where(n > 1, np.sqrt(var * n / (n - 1)), np.nan)
+
+
+def _bootstrap_std_interval(
+        values: np.ndarray,
+        weights: np.ndarray,
+        strata: np.ndarray,
+        confidence: float,
+        n_boot: int,
+        random_state: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    分层 bootstrap 估计标准差的百分位置信区间：每个分层内有放回重抽样，保持各层样本数不变（内部函数）
+    :return: (下限, 上限)
+    """
+    rng = np.random.default_rng(random_state)
+    codes, uniques = pd.factorize(strata, use_na_sentinel=False)
+    groups = [np.flatnonzero(codes == k) for k in range(len(uniques))]
+    stds = np.empty((n_boot, values.shape[1]))
+    for b in range(n_boot):
+        idx = np.concatenate([rng.choice(group, size=len(group)) for group in groups])
+        stds[b] = _weighted_std(values[idx], weights[idx])
+    alpha = (1 - confidence) / 2
+    # 有效值不足 2 个的列标准差为 NaN，分位数同样为 NaN
+    valid = ~np.isnan(stds).all(axis=0)
+    lower = np.full(values.shape[1], np.nan)
+    upper = np.full(values.shape[1], np.nan)
+    if valid.any():
+        lower[valid], upper[valid] = np.nanquantile(stds[:, valid], [alpha, 1 - alpha], axis=0)
+    return lower, upper
+
+
+def approximate_stats(
+        sample: pd.DataFrame,
+        strata_counts: pd.Series,
+        strata_col: str | None = None,
+        confidence: float = 0.95,
+        top_n: int = 10,
+        n_boot: int = 200,
+        random_state: int = 0
+) -> dict:
+    """
+    基于分层样本的近似 EDA，每个统计量都附带置信区间或相对误差
+    - missing：缺失率的分层估计及置信区间
+    - numeric：
+      - count：由缺失率的置信区间换算
+      - mean：分层估计及置信区间 / 相对误差
+      - std：按抽样权重估计，分层 bootstrap 百分位置信区间
+      - 分位数：顺序统计量置信区间
+      - min / max：样本极值，只是全量极值的界（全量最小值不大于 min，最大值不小于 max），
+        没有置信区间，在结果的 attrs["bounds_only"] 中标出
+    - categorical：各列高频取值的占比及置信区间、估计总数
+    - correlation：Pearson 相关系数及 Fisher z 置信区间
+    :param sample: 样本（如 data_loader.load_raw_sample 的结果）
+    :param strata_counts: 各分层在全量数据中的行数
+    :param strata_col: 分层列，默认 config.TARGET_COL
+    :param confidence: 置信水平
+    :param top_n: 每个类别列返回的取值个数
+    :param n_boot: 标准差 bootstrap 的重抽样次数
+    :param random_state: bootstrap 随机种子
+    :return: 各项结果组成的字典
+    """
+    strata_col = strata_col or config.TARGET_COL
+    strata = sample[strata_col].astype(object).to_numpy()
+    strata_counts = strata_counts.copy()
+    strata_counts.index = strata_counts.index.astype(object)
+    total = int(strata_counts.sum())
+    z_crit = NormalDist().inv_cdf(0.5 + confidence / 2)
+    result = {"num_samples": len(sample), "num_rows": total, "confidence": confidence}
+
+    # 1. 缺失率
+    rate, se = _stratified_estimate(sample.isnull().astype(np.float64), strata, strata_counts)
+    result["missing"] = pd.DataFrame({
+        "missing_count": (rate * total).round(),
+        "missing_rate": rate,
+        "lower": (rate - z_crit * se).clip(0, 1),
+        "upper": (rate + z_crit * se).clip(0, 1)
+    }).sort_values(by="missing_rate", ascending=False)
+
+    # 2. 数值特征
+    numeric_df = sample.select_dtypes(include=[np.number])
+    mean, se = _stratified_estimate(numeric_df.astype(np.float64), strata, strata_counts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rel_error = z_crit * se / mean.abs()
+    missing = result["missing"].reindex(numeric_df.columns)
+    values = numeric_df.to_numpy(dtype=np.float64)
+    # 每行代表的全量行数 N_h / n_h
+    sizes = pd.Series(strata).map(pd.Series(strata).value_counts(dropna=False)).to_numpy(dtype=np.float64)
+    weights = pd.Series(strata).map(strata_counts).to_numpy(dtype=np.float64) / sizes
+    std_lower, std_upper = _bootstrap_std_interval(values, weights, strata, confidence, n_boot, random_state)
+    numeric = pd.DataFrame({
+        "count": ((1 - missing["missing_rate"]) * total).round(),
+        "count_lower": ((1 - missing["upper"]) * total).round(),
+        "count_upper": ((1 - missing["lower"]) * total).round(),
+        "mean": mean,
+        "mean_lower": mean - z_crit * se,
+        "mean_upper": mean + z_crit * se,
+        "mean_rel_error": rel_error,
+        "std": _weighted_std(values, weights),
+        "std_lower": std_lower,
+        "std_upper": std_upper,
+        "min": numeric_df.min()
+    })
+    for q in (0.25, 0.5, 0.75):
+        label = f"{int(q * 100)}%"
+        estimates, lowers, uppers = [], [], []
+        for col in numeric_df.columns:
+            values = np.sort(numeric_df[col].dropna().to_numpy(dtype=np.float64))
+            n = len(values)
+            if n == 0:
+                estimates.append(np.nan), lowers.append(np.nan), uppers.append(np.nan)
+                continue
+            # 分位数的顺序统计量置信区间：秩 n*q ± z*sqrt(n*q*(1-q))
+            half = z_crit * np.sqrt(n * q * (1 - q))
+            estimates.append(np.quantile(values, q))
+            lowers.append(values[int(np.clip(np.floor(n * q - half), 0, n - 1))])
+            uppers.append(values[int(np.clip(np.ceil(n * q + half), 0, n - 1))])
+        numeric[label] = estimates
+        numeric[f"{label}_lower"] = lowers
+        numeric[f"{label}_upper"] = uppers
+    numeric["max"] = numeric_df.max()
+    numeric.attrs["bounds_only"] = ["min", "max"]
+    result["numeric"] = numeric
+
+    # 3. 类别特征高频取值
+    categorical = {}
+    for col in sample.select_dtypes(include=["object", "category"]).columns:
+        values = sample[col].astype(object)
+        top_values = values.value_counts(dropna=False).head(top_n).index
+        indicators = pd.DataFrame(
+            {value: (values.isna() if pd.isna(value) else values == value).astype(np.float64)
+             for value in top_values}
+        )
+        rate, se = _stratified_estimate(indicators, strata, strata_counts)
+        rate.index = top_values
+        se.index = top_values
+        table = pd.DataFrame({
+            "count": (rate * total).round(),
+            "rate": rate,
+            "lower": (rate - z_crit * se).clip(0, 1),
+            "upper": (rate + z_crit * se).clip(0, 1)
+        }).sort_values(by="rate", ascending=False)
+        table.index.name = col
+        categorical[col] = table
+    result["categorical"] = categorical
+
+    # 4. 相关性
+    corr = numeric_df.corr()
+    present = numeric_df.notna().to_numpy(dtype=np.float64)
+    lower, upper = _fisher_interval(corr, present.T @ present, 1.0, 3, confidence)
+    result["correlation"] = (corr, lower, upper)
+    return result
+
+
+class GroupCube:
+    """
+    分组 × 特征 的计数立方体
+    - 分组列和每个特征都编码为整数，np.bincount 一次得到计数矩阵
+    - 高基数数值特征（如 age）按等宽分箱，避免交叉表列数爆炸
+    - 交叉表请求（计数或按行归一化）直接由计数矩阵得到，不再扫描原始数据
+    """
+
+    def __init__(self, group_col: str):
+        """
+        :param group_col: 分组列名（如 'lifecycle'）
+        """
+        self.group_col = group_col
+        self.group_labels = None
+        self.counts = {}
+        self.labels = {}
+        self.source = None
+
+    def _encode_feature(self, series: pd.Series, bins: int, max_distinct: int):
+        """
+        把特征编码为整数（内部方法）
+        :return: (编码，缺失为 -1；取值标签)
+        """
+        if (pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+                and series.nunique() > max_distinct):
+            binned = pd.cut(series, bins=bins, include_lowest=True)
+            return binned.cat.codes.to_numpy(), binned.cat.categories
+        codes, labels = pd.factorize(series, sort=True)
+        return codes, labels
+
+    def build(
+            self,
+            df: pd.DataFrame,
+            features: list | None = None,
+            bins: int | None = None,
+            max_distinct: int | None = None
+    ) -> "GroupCube":
+        """
+        一次遍历所有特征构建计数矩阵
+        :param df: 数据
+        :param features: 特征列，默认除分组列以外的全部列
+        :param bins: 数值特征分箱数，默认 config.CUBE_NUMERIC_BINS
+        :param max_distinct: 数值特征不同取值数超过该值时分箱，默认 config.CUBE_MAX_DISTINCT
+        :return: self
+        """
+        bins = bins or config.CUBE_NUMERIC_BINS
+        max_distinct = max_distinct or config.CUBE_MAX_DISTINCT
+        features = features or [col for col in df.columns if col != self.group_col]
+        group_codes, self.group_labels = pd.factorize(df[self.group_col], sort=True)
+        num_groups = len(self.group_labels)
+        group_valid = group_codes >= 0
+        for col in features:
+            codes, labels = self._encode_feature(df[col], bins, max_distinct)
+            valid = group_valid & (codes >= 0)
+            flat = group_codes[valid].astype(np.int64) * len(labels) + codes[valid]
+            self.counts[col] = np.bincount(flat, minlength=num_groups * len(labels)).reshape(
+                num_groups, len(labels)
+            )
+            self.labels[col] = labels
+        return self
+
+    def crosstab(self, feature_col: str, normalize: bool = True) -> pd.DataFrame:
+        """
+        与 pd.crosstab(df[group_col], df[feature_col]) 格式一致的交叉表
+        :param feature_col: 特征列名
+        :param normalize: 是否按行计算比例，默认 True
+        :return: DataFrame
+        """
+        counts = self.counts[feature_col]
+        # 与 pd.crosstab 一致，只保留出现过的行和列
+        rows = counts.sum(axis=1) > 0
+        cols = counts.sum(axis=0) > 0
+        counts = counts[np.ix_(rows, cols)]
+        index = pd.Index(np.asarray(self.group_labels)[rows], name=self.group_col)
+        columns = pd.Index(self.labels[feature_col][cols], name=feature_col)
+        if normalize:
+            return pd.DataFrame(counts / counts.sum(axis=1, keepdims=True), index=index, columns=columns)
+        return pd.DataFrame(counts, index=index, columns=columns)
+
+    def save(self, path: str) -> None:
+        """
+        :param path: 保存路径
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f)
+        os.replace(tmp_path, path)
+
+
+def load_group_cube(group_col: str | None = None, df: pd.DataFrame | None = None) -> GroupCube:
+    """
+    读取或构建原始数据的分组计数立方体，保存在列式缓存目录中
+    以 data_loader.raw_data_fingerprint 作为新鲜度键，支持单个文件、目录和通配符路径，任一分片变化后自动重建
+    :param group_col: 分组列名，默认 config.TARGET_COL
+    :param df: 已加载的原始数据，需要重建时使用，默认重新加载
+    :return: GroupCube
+    """
+    group_col = group_col or config.TARGET_COL
+    source = data_loader.raw_data_fingerprint()
+    # 目录或通配符路径没有可用的文件名，用绝对路径的哈希命名
+    name = hashlib.sha1(os.path.abspath(config.RAW_DATA_PATH).encode("utf-8")).hexdigest()[:12]
+    path = os.path.join(config.CACHE_DIR, f"raw-{name}.{group_col}.cube.pkl")
+    try:
+        with open(path, "rb") as f:
+            cube = pickle.load(f)
+        if cube.source == source:
+            return cube
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+    if df is None:
+        df = data_loader.load_raw_data()
+    cube = GroupCube(group_col).build(df)
+    cube.source = source
+    cube.save(path)
+    return cube
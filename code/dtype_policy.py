@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+import config
+
+# 标志列（缺失指示、异常标记）的列名后缀
+FLAG_SUFFIXES = ("_is_null", "_is_missing", "_abnormal")
+
+
+def memory_bytes(obj) -> int:
+    """
+    数据占用的内存字节数（字符串按实际内容计算）
+    :param obj: DataFrame / Series / NumPy 数组 / scipy 稀疏矩阵
+    :return: 字节数
+    """
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=False, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=False, deep=True))
+    if sp.issparse(obj):
+        obj = obj.tocsr()
+        return int(obj.data.nbytes + obj.indices.nbytes + obj.indptr.nbytes)
+    return int(np.asarray(obj).nbytes)
+
+
+def report_memory(stage: str, before: int, after: int) -> None:
+    """
+    打印某个阶段类型压缩前后的内存
+    :param stage: 阶段名称
+    :param before: 压缩前字节数
+    :param after: 压缩后字节数
+    """
+    saved = before - after
+    ratio = saved / before if before else 0.0
+    print(
+        f"{stage}内存：{before / 1024 ** 2:.2f} MB -> {after / 1024 ** 2:.2f} MB，"
+        f"节省 {saved / 1024 ** 2:.2f} MB（{ratio:.0%}）"
+    )
+
+
+def compact_dtypes(
+        df: pd.DataFrame,
+        categorical_cols: list | None = None,
+        flag_cols: list | None = None,
+        stage: str | None = None,
+        inplace: bool = False,
+        floats: bool = True
+) -> pd.DataFrame:
+    """
+    按类型策略压缩 DataFrame：
+    - 标志列（默认按 FLAG_SUFFIXES 识别）转为 config.FLAG_DTYPE
+    - 浮点列转为 config.FEATURE_DTYPE（floats=False 时保持原精度）
+    - 字符串列中唯一值占比不超过 config.CATEGORY_MAX_RATIO 的转为 category
+    整数列保持原样（如 user_id，转浮点会丢精度）
+    :param df: DataFrame
+    :param categorical_cols: 候选类别列，默认全部字符串列
+    :param flag_cols: 标志列，默认按列名后缀识别
+    :param stage: 阶段名称，传入时打印压缩前后的内存
+    :param inplace: 是否直接修改传入的 df，默认 False
+    :param floats: 是否把浮点列转为 float32；原始数值（如清洗快照）应传 False，
+        只在特征矩阵上降精度，避免不同的原始值被合并
+    :return: 压缩后的 DataFrame
+    """
+    before = memory_bytes(df) if stage else 0
+    df_new = df if inplace else df.copy()
+    if flag_cols is None:
+        flag_cols = [col for col in df_new.columns if str(col).endswith(FLAG_SUFFIXES)]
+    if categorical_cols is None:
+        categorical_cols = [
+            col for col in df_new.columns
+            if pd.api.types.is_object_dtype(df_new[col]) or pd.api.types.is_string_dtype(df_new[col])
+        ]
+    conversions = {}
+    for col in flag_cols:
+        if pd.api.types.is_numeric_dtype(df_new[col]) and df_new[col].dtype != config.FLAG_DTYPE:
+            conversions[col] = config.FLAG_DTYPE
+    for col in df_new.columns if floats else []:
+        if col not in conversions and pd.api.types.is_float_dtype(df_new[col]) \
+                and df_new[col].dtype != config.FEATURE_DTYPE:
+            conversions[col] = config.FEATURE_DTYPE
+    max_distinct = max(1, int(len(df_new) * config.CATEGORY_MAX_RATIO))
+    for col in categorical_cols:
+        if not isinstance(df_new[col].dtype, pd.CategoricalDtype) and df_new[col].nunique() <= max_distinct:
+            conversions[col] = "category"
+    # 逐列替换，峰值内存只多出一列
+    for col, dtype in conversions.items():
+        df_new[col] = df_new[col].astype(dtype)
+    if stage:
+        report_memory(stage, before, memory_bytes(df_new))
+    return df_new
+
+
+def as_feature_matrix(x, stage: str | None = None):
+    """
+    把特征统一为 config.FEATURE_DTYPE（已是该类型时不复制）
+    sklearn 对非 float32 / float64 的输入会先转换成 float64 矩阵，
+    打印的内存对比即相对于这份 float64 矩阵
+    :param x: DataFrame / NumPy 数组 / scipy 稀疏矩阵
+    :param stage: 阶段名称，传入时打印内存对比
+    :return: 转换后的特征
+    """
+    if isinstance(x, pd.DataFrame):
+        if not all(dtype == config.FEATURE_DTYPE for dtype in x.dtypes):
+            x = x.astype(config.FEATURE_DTYPE)
+    elif sp.issparse(x):
+        x = x.astype(config.FEATURE_DTYPE, copy=False)
+    else:
+        x = np.asarray(x).astype(config.FEATURE_DTYPE, copy=False)
+    if stage:
+        after = memory_bytes(x)
+        values = x.tocsr().data.size if sp.issparse(x) else int(np.prod(x.shape))
+        extra = 8 - np.dtype(config.FEATURE_DTYPE).itemsize
+        report_memory(stage, after + values * extra, after)
+    return x
@@ -1,9 +1,14 @@
 import time
-from config import START, TARGET_COL
+from config import START, TARGET_COL, FLAG_DTYPE, CODE_DTYPE
+import numpy as np
 import pandas as pd
-from data_loader import data_loader
+import scipy.sparse as sp
+from joblib import dump, load
 from data_clean import data_clean
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+from dtype_policy import compact_dtypes
+
+# 频率截断后低频类别合并到的取值
+OTHER_CATEGORY = "__other__"
 
 
 def add_missing_indicators(
@@ -20,7 +25,7 @@ def add_missing_indicators(
     """
     df_new = df.copy()
     for col in numeric_cols:
-        df_new[f"{col}_is_missing"] = (df_new[col] == missing_value).astype(int)
+        df_new[f"{col}_is_missing"] = (df_new[col] == missing_value).astype(FLAG_DTYPE)
 
     return df_new
 
@@ -35,8 +40,8 @@ def split_columns_by_type(df: pd.DataFrame, target_col: str):
         indicator_cols: 缺失值指示列和异常列
     """
     # 1. 初步按 dtype 划分
-    numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns.tolist()
-    categorical_cols = df.select_dtypes(include=["object"]).columns.tolist()
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    categorical_cols = df.select_dtypes(include=["object", "category"]).columns.tolist()
 
     # 2. 从类别特征中剔除标签列
     if target_col in categorical_cols:
@@ -55,26 +60,139 @@ def split_columns_by_type(df: pd.DataFrame, target_col: str):
     return numeric_cols, categorical_cols, indicator_cols
 
 
+class IncrementalScaler:
+    """
+    基于可合并矩（计数、均值、平方和，Chan / Welford 合并）的增量标准化器
+    - partial_fit：逐块累积，新一天的增量数据直接 partial_fit，无需重新扫描历史数据
+    - merge：合并在其他进程 / 分区上拟合的结果
+    - transform_inplace：在 float32 缓冲区上原地标准化
+    属性 mean_ / var_ / scale_ / n_samples_seen_ 与 sklearn StandardScaler 含义一致（缺失值不计入）
+    """
+
+    def __init__(self):
+        self.columns = None
+        self.count = None
+        self.mean = None
+        self.m2 = None
+
+    def partial_fit(self, data, columns: list | None = None):
+        """
+        累积一块数据的矩
+        :param data: DataFrame 或二维数组
+        :param columns: DataFrame 中要标准化的列，默认全部列
+        :return: self
+        """
+        if isinstance(data, pd.DataFrame):
+            columns = list(columns if columns is not None else data.columns)
+            x = data[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            x = np.asarray(data, dtype=np.float64)
+        if self.count is None:
+            self.columns = columns
+            self.count = np.zeros(x.shape[1])
+            self.mean = np.zeros(x.shape[1])
+            self.m2 = np.zeros(x.shape[1])
+        count = (~np.isnan(x)).sum(axis=0).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.nansum(x, axis=0) / count
+            m2 = np.nansum((x - mean) ** 2, axis=0)
+        self._merge_moments(count, mean, m2)
+        return self
+
+    def _merge_moments(self, count, mean, m2) -> None:
+        """
+        Chan / Welford 方式合并均值与平方和（内部方法）
+        """
+        total = self.count + count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = np.where(count > 0, mean, 0) - self.mean
+            ratio = np.where(total > 0, count / total, 0)
+            self.mean = np.where(count > 0, self.mean + delta * ratio, self.mean)
+            self.m2 = self.m2 + np.where(count > 0, m2 + delta ** 2 * self.count * ratio, 0)
+        self.count = total
+
+    def merge(self, other: "IncrementalScaler") -> "IncrementalScaler":
+        """
+        合并另一个标准化器（两者列结构需一致）
+        :param other: 另一个 IncrementalScaler
+        :return: self
+        """
+        if other.count is None:
+            return self
+        if self.count is None:
+            self.columns = other.columns
+            self.count, self.mean, self.m2 = other.count.copy(), other.mean.copy(), other.m2.copy()
+            return self
+        if len(self.count) != len(other.count) or self.columns != other.columns:
+            raise ValueError("合并的标准化器列结构不一致")
+        self._merge_moments(other.count, other.mean, other.m2)
+        return self
+
+    @property
+    def n_samples_seen_(self) -> np.ndarray:
+        return self.count.astype(np.int64)
+
+    @property
+    def mean_(self) -> np.ndarray:
+        return self.mean
+
+    @property
+    def var_(self) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > 0, self.m2 / self.count, 0.0)
+
+    @property
+    def scale_(self) -> np.ndarray:
+        # 与 StandardScaler 一致：方差为 0 的列不缩放
+        scale = np.sqrt(self.var_)
+        return np.where(scale > 0, scale, 1.0)
+
+    def transform_inplace(self, buf: np.ndarray) -> np.ndarray:
+        """
+        在 float32（或 float64）二维缓冲区上原地标准化
+        :param buf: 形状为 (行数, 列数) 的数组，列顺序与拟合时一致
+        :return: buf 本身
+        """
+        if self.count is None:
+            raise ValueError("IncrementalScaler 尚未拟合，请先调用 partial_fit")
+        buf -= self.mean.astype(buf.dtype)
+        buf /= self.scale_.astype(buf.dtype)
+        return buf
+
+    def transform(self, data, columns: list | None = None) -> np.ndarray:
+        """
+        标准化，结果为新的 float32 数组（只复制一次）
+        :param data: DataFrame 或二维数组
+        :param columns: DataFrame 中要标准化的列，默认拟合时的列
+        :return: float32 数组
+        """
+        if isinstance(data, pd.DataFrame):
+            columns = columns if columns is not None else self.columns
+            # copy=True：写时复制下 to_numpy 可能返回只读视图，原地标准化需要可写缓冲区
+            buf = data[columns].to_numpy(dtype=np.float32, na_value=np.nan, copy=True)
+        else:
+            buf = np.array(data, dtype=np.float32)
+        return self.transform_inplace(buf)
+
+
 def scale_numeric_features(
         df: pd.DataFrame,
         numeric_cols: list,
-        scaler: StandardScaler | None = None
+        scaler: IncrementalScaler | None = None
 ):
     """
     数值特征标准化
     :param df:DataFrame
     :param numeric_cols:数值型列名
-    :param scaler:训练阶段传 None，预测阶段传已有 scaler
+    :param scaler:训练阶段传 None，预测 / 分块阶段传已有 scaler（可以先用 partial_fit 逐块拟合）
     :return:
-        df_new:DataFrame标准化后的数据
+        df_new:DataFrame标准化后的数据（数值列为 float32）
         scaler:
     """
-    df_new = df.copy()
     if scaler is None:
-        scaler = StandardScaler()
-        df_new[numeric_cols] = scaler.fit_transform(df_new[numeric_cols])
-    else:
-        df_new[numeric_cols] = scaler.transform(df_new[numeric_cols])
+        scaler = IncrementalScaler().partial_fit(df, numeric_cols)
+    df_new = df.copy()
+    df_new[numeric_cols] = scaler.transform(df, numeric_cols)
 
     return df_new, scaler
 
@@ -87,14 +205,125 @@ def one_hot_encode(df: pd.DataFrame, categorical_cols: list) -> pd.DataFrame:
     :return:One-Hot 编码后的数据
     """
 
-    return pd.get_dummies(df, columns=categorical_cols, drop_first=False)
+    return pd.get_dummies(df, columns=categorical_cols, drop_first=False, dtype=FLAG_DTYPE)
+
+
+def _lookup_codes(series: pd.Series, classes: pd.Index) -> np.ndarray:
+    """
+    把一列取值映射为在 classes 中的下标，不存在的取值为 -1（内部函数）
+    category 类型只查找一次类别表，再按编码取值
+    :param series: 类别列
+    :param classes: 取值表
+    :return: 整数下标
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        lookup = np.append(classes.get_indexer(series.cat.categories), -1)
+        return lookup[series.cat.codes.to_numpy()]
+    return classes.get_indexer(series)
+
+
+def fit_one_hot_categories(
+        df: pd.DataFrame,
+        categorical_cols: list,
+        min_frequency: int | float | None = None,
+        max_categories: int | None = None
+) -> dict:
+    """
+    确定每个类别列 One-Hot 保留的取值
+    设置频率截断时，低频取值（以及预测时未见过的取值）合并为 OTHER_CATEGORY
+    :param df: 训练数据
+    :param categorical_cols: 类别型列名
+    :param min_frequency: 最小出现次数，小于 1 的小数表示占比
+    :param max_categories: 每列最多保留的取值个数（按频次从高到低）
+    :return: 字典，键为列名，值为保留的取值列表（排序后，截断时末尾为 OTHER_CATEGORY）
+    """
+    capped = min_frequency is not None or max_categories is not None
+    if min_frequency is not None and min_frequency < 1:
+        min_frequency = min_frequency * len(df)
+    categories = {}
+    for col in categorical_cols:
+        counts = df[col].value_counts(dropna=True, sort=True)
+        if min_frequency is not None:
+            counts = counts[counts >= min_frequency]
+        if max_categories is not None:
+            counts = counts.head(max_categories)
+        values = counts.index
+        try:
+            values = values.sort_values()
+        except TypeError:
+            pass
+        categories[col] = values.tolist() + ([OTHER_CATEGORY] if capped else [])
+    return categories
+
+
+def sparse_one_hot(
+        df: pd.DataFrame,
+        categorical_cols: list,
+        categories: dict | None = None,
+        n_hash_features: int | None = None
+):
+    """
+    直接由类别编码构建稀疏 CSR 格式的 One-Hot 矩阵，不生成稠密的哑变量表
+    - categories：每列保留的取值（见 fit_one_hot_categories），未见过的取值合并到 OTHER_CATEGORY，
+      没有 OTHER_CATEGORY 时整行为 0（与 get_dummies 对缺失值的处理一致）
+    - n_hash_features：哈希技巧，所有列的 "列名=取值" 哈希到固定个数的列，无需保存词表
+    :param df: 清洗好的数据
+    :param categorical_cols: 类别型列名
+    :param categories: 已确定的取值表，为 None 时按 df 拟合（不截断）
+    :param n_hash_features: 哈希列数，设置后忽略 categories
+    :return:
+        matrix: CSR 稀疏矩阵
+        feature_names: 列名列表
+        categories: 使用的取值表（哈希模式为 None）
+    """
+    n = len(df)
+    indices = np.full((n, len(categorical_cols)), -1, dtype=np.int64)
+    if n_hash_features:
+        for j, col in enumerate(categorical_cols):
+            codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+            keys = np.array([f"{col}={value}" for value in uniques], dtype=object)
+            buckets = (pd.util.hash_array(keys) % np.uint64(n_hash_features)).astype(np.int64)
+            indices[:, j] = buckets[codes]
+        feature_names = [f"hash_{i}" for i in range(n_hash_features)]
+        categories = None
+        width = n_hash_features
+    else:
+        if categories is None:
+            categories = fit_one_hot_categories(df, categorical_cols)
+        feature_names = []
+        offset = 0
+        for j, col in enumerate(categorical_cols):
+            values = categories[col]
+            codes = _lookup_codes(df[col], pd.Index(values))
+            if values and values[-1] == OTHER_CATEGORY:
+                codes = np.where((codes < 0) & df[col].notna().to_numpy(), len(values) - 1, codes)
+            indices[:, j] = np.where(codes >= 0, codes + offset, -1)
+            feature_names += [f"{col}_{value}" for value in values]
+            offset += len(values)
+        width = offset
+    valid = indices >= 0
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(valid.sum(axis=1), out=indptr[1:])
+    matrix = sp.csr_matrix(
+        (np.ones(indptr[-1], dtype=np.float32), indices[valid], indptr),
+        shape=(n, width)
+    )
+    # 哈希冲突时同一行可能出现重复列，合并为计数
+    matrix.sum_duplicates()
+    return matrix, feature_names, categories
 
 
 def build_features_for_ml(
         df: pd.DataFrame,
         numeric_cols: list,
         categorical_cols: list,
-        scaler: StandardScaler | None = None
+        scaler: IncrementalScaler | None = None,
+        sparse: bool = False,
+        categories: dict | None = None,
+        min_frequency: int | float | None = None,
+        max_categories: int | None = None,
+        n_hash_features: int | None = None,
+        target_col: str = TARGET_COL
 ):
     """
     传统机器学习模型（LR / RF）特征工程主入口
@@ -105,10 +334,23 @@ def build_features_for_ml(
     :param numeric_cols:
     :param categorical_cols:
     :param scaler:
+    :param sparse: 是否输出稀疏矩阵（高基数类别列推荐），默认 False 输出 DataFrame
+    :param categories: 稀疏模式下已拟合的取值表，训练阶段传 None
+    :param min_frequency: 稀疏模式下的最小出现次数，低频取值合并为 OTHER_CATEGORY
+    :param max_categories: 稀疏模式下每列最多保留的取值个数
+    :param n_hash_features: 稀疏模式下使用哈希技巧的列数
+    :param target_col: 标签列，稀疏模式下不进入特征矩阵
     :return:
         df_new:DataFrame最终可用于模型训练的数据
         scaler:数值特征标准化器
+        稀疏模式返回 (x, feature_names, scaler, categories)：
+        x 为 CSR 矩阵，依次为数值列（含指示列）和 One-Hot 列，feature_names 为对应列名
     """
+    if sparse:
+        return _build_sparse_features_for_ml(
+            df, numeric_cols, categorical_cols, scaler,
+            categories, min_frequency, max_categories, n_hash_features, target_col
+        )
     df_new = df.copy()
     # 1. 数值特征标准化
     df_new, scaler = scale_numeric_features(
@@ -125,30 +367,203 @@ def build_features_for_ml(
     return df_new, scaler
 
 
-def encode_categorical_for_dl(df: pd.DataFrame, categorical_cols: list):
+def _build_sparse_features_for_ml(
+        df: pd.DataFrame,
+        numeric_cols: list,
+        categorical_cols: list,
+        scaler: IncrementalScaler | None,
+        categories: dict | None,
+        min_frequency: int | float | None,
+        max_categories: int | None,
+        n_hash_features: int | None,
+        target_col: str
+):
+    """
+    build_features_for_ml 的稀疏输出（内部函数）
+    """
+    # 1. 数值特征标准化（只转换需要的列，不复制整张表）
+    if scaler is None:
+        scaler = IncrementalScaler().partial_fit(df, numeric_cols)
+    other_cols = [
+        col for col in df.select_dtypes(include=[np.number]).columns
+        if col not in numeric_cols and col != target_col
+    ]
+    numeric = np.hstack([
+        scaler.transform(df, numeric_cols),
+        df[other_cols].to_numpy(dtype=np.float32)
+    ])
+    # 2. 类别特征稀疏 One-Hot
+    if categories is None and not n_hash_features:
+        categories = fit_one_hot_categories(df, categorical_cols, min_frequency, max_categories)
+    one_hot, one_hot_names, categories = sparse_one_hot(df, categorical_cols, categories, n_hash_features)
+    x = sp.hstack([sp.csr_matrix(numeric), one_hot], format="csr")
+
+    return x, numeric_cols + other_cols + one_hot_names, scaler, categories
+
+
+class DictionaryEncoder:
+    """
+    向量化的类别词典编码器，替代逐列的 LabelEncoder
+    - 编码基于 category 编码或 pd.factorize 哈希表：每列只在去重后的取值上查词表，再按编码取值
+    - 下标 0 保留给词表外（OOV）取值和缺失值，词表内取值从 1 开始
+    - 支持按出现次数裁剪词表（低频取值编码为 OOV）和限制词表大小
+    - save / load 以压缩的 npz 保存词表和计数，不依赖 pickle
+    """
+
+    OOV_INDEX = 0
+
+    def __init__(self, min_frequency: int | None = None, max_vocab: int | None = None):
+        """
+        :param min_frequency: 进入词表的最小出现次数
+        :param max_vocab: 每列词表最多保留的取值个数（按出现次数从高到低）
+        """
+        self.min_frequency = min_frequency
+        self.max_vocab = max_vocab
+        self.columns = []
+        self.counts = {}
+        self.vocab = {}
+
+    def fit(self, data, columns: list):
+        """
+        拟合词表
+        :param data: DataFrame，或数据块迭代器（流式拟合）
+        :param columns: 类别型列名
+        :return: self
+        """
+        self.columns, self.counts, self.vocab = [], {}, {}
+        for chunk in [data] if isinstance(data, pd.DataFrame) else data:
+            self.partial_fit(chunk, columns)
+        return self
+
+    def partial_fit(self, df: pd.DataFrame, columns: list):
+        """
+        累加一块数据的取值计数并更新词表
+        :param df: 数据块
+        :param columns: 类别型列名
+        :return: self
+        """
+        for col in columns:
+            if col not in self.counts:
+                self.columns.append(col)
+                self.counts[col] = pd.Series(dtype=np.int64)
+            counts = df[col].value_counts(dropna=True)
+            counts = counts[counts > 0]
+            counts.index = counts.index.astype(str)
+            counts = counts.groupby(level=0).sum()
+            self.counts[col] = self.counts[col].add(counts, fill_value=0).astype(np.int64)
+            self.vocab[col] = self._build_vocab(self.counts[col])
+        return self
+
+    def _build_vocab(self, counts: pd.Series) -> pd.Index:
+        """
+        按频次裁剪并排序词表（内部方法）
+        :param counts: 取值计数
+        :return: 排好序的词表
+        """
+        if self.min_frequency is not None:
+            counts = counts[counts >= self.min_frequency]
+        if self.max_vocab is not None and len(counts) > self.max_vocab:
+            # 频次相同的取值按字典序取舍，保证结果确定
+            counts = counts.sort_index().sort_values(ascending=False, kind="stable").head(self.max_vocab)
+        return counts.index.sort_values()
+
+    @property
+    def vocab_sizes(self) -> dict:
+        """
+        每列的编码个数（含 OOV），即 Embedding 层的 num_embeddings
+        """
+        return {col: len(self.vocab[col]) + 1 for col in self.columns}
+
+    def transform(self, df: pd.DataFrame, columns: list | None = None) -> np.ndarray:
+        """
+        一次编码所有类别列
+        :param df: 数据
+        :param columns: 要编码的列，默认拟合时的全部列
+        :return: C 连续的 config.CODE_DTYPE（int32）矩阵，每列对应一个类别列，0 为 OOV
+        """
+        columns = columns or self.columns
+        out = np.empty((len(df), len(columns)), dtype=CODE_DTYPE)
+        for j, col in enumerate(columns):
+            out[:, j] = self.transform_column(df[col], col)
+        return out
+
+    def transform_column(self, series: pd.Series, col: str) -> np.ndarray:
+        """
+        编码一列：先对去重后的取值查词表，再按编码取值
+        :param series: 类别列
+        :param col: 列名
+        :return: int32 编码，0 为 OOV
+        """
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series)
+            uniques = pd.Index(uniques)
+        # 词表外取值 get_indexer 为 -1，加 1 后正好落在 OOV 下标 0；末尾一项对应缺失值编码 -1
+        lookup = np.append(self.vocab[col].get_indexer(uniques.astype(str)) + 1, self.OOV_INDEX)
+        return lookup[codes].astype(CODE_DTYPE, copy=False)
+
+    def save(self, path: str) -> None:
+        """
+        以压缩的 npz 保存词表和计数
+        :param path: 文件路径
+        """
+        arrays = {"columns": np.array(self.columns, dtype=str)}
+        for i, col in enumerate(self.columns):
+            arrays[f"values_{i}"] = self.counts[col].index.to_numpy(dtype=str)
+            arrays[f"counts_{i}"] = self.counts[col].to_numpy(dtype=np.int64)
+        arrays["params"] = np.array([
+            -1 if self.min_frequency is None else self.min_frequency,
+            -1 if self.max_vocab is None else self.max_vocab
+        ], dtype=np.int64)
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "DictionaryEncoder":
+        """
+        加载 save 保存的编码器
+        :param path: 文件路径
+        :return: DictionaryEncoder
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            min_frequency, max_vocab = (None if v < 0 else int(v) for v in arrays["params"])
+            encoder = cls(min_frequency, max_vocab)
+            for i, col in enumerate(arrays["columns"].tolist()):
+                encoder.columns.append(col)
+                encoder.counts[col] = pd.Series(arrays[f"counts_{i}"], index=arrays[f"values_{i}"].astype(object))
+                encoder.vocab[col] = encoder._build_vocab(encoder.counts[col])
+        return encoder
+
+
+def encode_categorical_for_dl(
+        df: pd.DataFrame,
+        categorical_cols: list,
+        encoders: DictionaryEncoder | None = None
+):
     """
     深度学习用的类别特征编码
-    - 每个类别列编码成整数
+    - 每个类别列编码成整数（0 为词表外取值，见 DictionaryEncoder）
     - 后续交给 Embedding 层
     :param df:DataFrame清洗好的数据集
     :param categorical_cols:类别型列名
+    :param encoders:训练阶段传 None，预测 / 分块阶段传已有 encoders
     :return:
         df_new:DataFrame编码后的数据
         encoders:编码器
     """
     df_new = df.copy()
-    encoders = {}
-    for col in categorical_cols:
-        encoder = LabelEncoder()
-        df_new[col] = encoder.fit_transform(df_new[col].astype(str))
-        encoders[col] = encoder
+    if encoders is None:
+        encoders = DictionaryEncoder().fit(df_new, categorical_cols)
+    df_new[categorical_cols] = encoders.transform(df_new, categorical_cols)
 
     return df_new, encoders
 
 
 def build_features_for_dl(
         df: pd.DataFrame,
-        scaler: StandardScaler | None = None
+        scaler: IncrementalScaler | None = None,
+        encoders: DictionaryEncoder | None = None
 ):
     """
     深度学习模型特征工程主入口
@@ -157,6 +572,8 @@ def build_features_for_dl(
     - 类别特征：整数编码（Embedding 用）
     - 不做 One-Hot
     :param df:DataFrame清洗好的数据集
+    :param scaler:训练阶段传 None，预测 / 分块阶段传已有 scaler
+    :param encoders:训练阶段传 None，预测 / 分块阶段传已有 encoders
     :return:
         df_new:DataFrame编码后的数据
         scaler:数值特征标准化器
@@ -174,11 +591,156 @@ def build_features_for_dl(
     # 2. 类别特征整数编码
     df_new, encoders = encode_categorical_for_dl(
         df_new,
-        categorical_cols=categorical_cols
+        categorical_cols=categorical_cols,
+        encoders=encoders
     )
+    # 3. 统一类型：标志列 uint8，数值特征 float32
+    df_new = compact_dtypes(df_new, stage='特征工程', inplace=True)
 
     return df_new, scaler, encoders
 
 
+def fit_features_for_dl(chunks):
+    """
+    流式拟合深度学习特征工程的全局统计量（第一遍扫描）
+    - 数值特征：IncrementalScaler.partial_fit 逐块累积均值 / 方差
+    - 类别特征：逐块累加取值计数，得到完整词表（DictionaryEncoder）
+    拟合结果传给 build_features_for_dl(chunk, scaler, encoders) 逐块转换（第二遍扫描），
+    与整表调用 build_features_for_dl 的结果一致
+    :param chunks: 清洗好的数据块迭代器
+    :return:
+        scaler:数值特征标准化器
+        encoders:编码器
+    """
+    pipeline = FeaturePipeline().fit(chunks)
+    return pipeline.scaler, pipeline.encoders
+
+
+class FeaturePipeline:
+    """
+    拟合一次、反复转换的深度学习特征流水线
+    - fit：确定列划分，拟合 IncrementalScaler 和类别词典 DictionaryEncoder（支持整表或数据块迭代器）
+    - transform：只做转换，直接写入一个 C 连续的 float32 矩阵，不复制输入数据
+    - save / load：整体序列化，推理和重新打分任务复用同一份拟合结果
+    输出列与 build_features_for_dl 一致（不含标签列），列名见 feature_names
+    """
+
+    def __init__(
+            self,
+            target_col: str = TARGET_COL,
+            missing_value: int | float = -1,
+            min_frequency: int | None = None,
+            max_vocab: int | None = None
+    ):
+        """
+        :param target_col: 标签列，不参与特征
+        :param missing_value: 数值列中表示缺失的占位值，用于生成 *_is_missing 指示列
+        :param min_frequency: 类别词表的最小出现次数，见 DictionaryEncoder
+        :param max_vocab: 类别词表的最大取值个数，见 DictionaryEncoder
+        """
+        self.target_col = target_col
+        self.missing_value = missing_value
+        self.min_frequency = min_frequency
+        self.max_vocab = max_vocab
+        self.numeric_cols = None
+        self.categorical_cols = None
+        self.indicator_cols = None
+        self.feature_names = None
+        self.scaler = None
+        self.encoders = None
+
+    def fit(self, data):
+        """
+        拟合列划分、标准化器和编码器
+        :param data: 清洗好的 DataFrame，或清洗好的数据块迭代器（流式拟合）
+        :return: self
+        """
+        chunks = [data] if isinstance(data, pd.DataFrame) else data
+        self.numeric_cols = None
+        self.scaler = IncrementalScaler()
+        self.encoders = DictionaryEncoder(self.min_frequency, self.max_vocab)
+        for chunk in chunks:
+            if self.numeric_cols is None:
+                self._split_columns(chunk)
+            self.scaler.partial_fit(chunk, self.numeric_cols)
+            self.encoders.partial_fit(chunk, self.categorical_cols)
+        if self.numeric_cols is None:
+            raise ValueError("没有可用于拟合的数据")
+        return self
+
+    def update(self, delta: pd.DataFrame):
+        """
+        用增量数据（如新一天的数据）更新数值标准化参数，无需重新扫描历史数据
+        类别词表保持不变，新取值编码为 OOV，避免已训练模型的编码错位
+        :param delta: 清洗好的增量数据
+        :return: self
+        """
+        if self.feature_names is None:
+            raise ValueError("FeaturePipeline 尚未拟合，请先调用 fit")
+        self.scaler.partial_fit(delta, self.numeric_cols)
+        return self
+
+    def _split_columns(self, df: pd.DataFrame) -> None:
+        """
+        确定列划分和输出列顺序（内部方法）
+        :param df: 第一块数据
+        """
+        self.numeric_cols, self.categorical_cols, self.indicator_cols = split_columns_by_type(df, self.target_col)
+        used = set(self.numeric_cols) | set(self.categorical_cols) | set(self.indicator_cols)
+        self.feature_names = [col for col in df.columns if col in used]
+        self.feature_names += [f"{col}_is_missing" for col in self.numeric_cols]
+
+    def transform(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        用拟合好的参数转换数据，不做任何拟合
+        :param df: 清洗好的数据（可以不含标签列）
+        :return: C 连续的 float32 矩阵，列顺序见 feature_names
+        """
+        if self.feature_names is None:
+            raise ValueError("FeaturePipeline 尚未拟合，请先调用 fit")
+        out = np.empty((len(df), len(self.feature_names)), dtype=np.float32)
+        position = {name: j for j, name in enumerate(self.feature_names)}
+        for col, mean, scale in zip(self.numeric_cols, self.scaler.mean_, self.scaler.scale_):
+            values = df[col].to_numpy()
+            # 缺失指示基于标准化前的原始值
+            np.equal(values, self.missing_value, out=out[:, position[f"{col}_is_missing"]], casting="unsafe")
+            column = out[:, position[col]]
+            np.subtract(values, mean, out=column, casting="unsafe")
+            np.divide(column, np.float32(scale), out=column)
+        for col in self.indicator_cols:
+            out[:, position[col]] = df[col].to_numpy()
+        for col in self.categorical_cols:
+            # 词表外取值编码为 DictionaryEncoder.OOV_INDEX
+            out[:, position[col]] = self.encoders.transform_column(df[col], col)
+        return out
+
+    def fit_transform(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        拟合并转换
+        :param df: 清洗好的数据
+        :return: C 连续的 float32 矩阵
+        """
+        return self.fit(df).transform(df)
+
+    def save(self, path: str) -> None:
+        """
+        保存拟合好的流水线
+        :param path: 文件路径
+        """
+        dump(self, path)
+
+    @classmethod
+    def load(cls, path: str) -> "FeaturePipeline":
+        """
+        加载拟合好的流水线
+        :param path: 文件路径
+        :return: FeaturePipeline
+        """
+        pipeline = load(path)
+        if not isinstance(pipeline, cls):
+            raise TypeError(f"{path} 不是 FeaturePipeline")
+        return pipeline
+
+
 if __name__ == '__main__':
     print(f'{time.time() - START:.2f}s')
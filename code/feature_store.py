@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+import data_clean
+import data_explore
+import data_loader
+import dtype_policy
+import feature_engineer
+from feature_engineer import FeaturePipeline
+
+
+def _code_fingerprint(modules: list | None = None) -> str:
+    """
+    加载 / 列划分 / 清洗 / 特征工程代码的指纹，代码改动后特征缓存自动失效（内部函数）
+    :param modules: 参与计算的模块，默认 data_loader、data_explore、data_clean、dtype_policy 和 feature_engineer
+    :return: 十六进制指纹
+    """
+    digest = hashlib.sha1()
+    for module in modules or [data_loader, data_explore, data_clean, dtype_policy, feature_engineer]:
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+# 影响清洗和特征结果的配置项，始终计入特征仓库的键
+FEATURE_CONFIG_KEYS = [
+    "TARGET_COL", "ABNORMAL_RULES", "CATEGORY_MAX_RATIO", "FLAG_DTYPE", "FEATURE_DTYPE", "CODE_DTYPE"
+]
+
+
+def feature_key(data_fingerprint: str, params: dict | None = None) -> str:
+    """
+    特征仓库的键：原始数据指纹 + 代码指纹 + 特征配置
+    FEATURE_CONFIG_KEYS 中的配置项自动计入，params 用于补充其它影响结果的参数（如调用时传入的填充值）
+    :param data_fingerprint: 原始数据指纹（见 data_loader.raw_data_fingerprint）
+    :param params: 额外影响特征结果的参数
+    :return: 十六进制键
+    """
+    settings = {name: getattr(config, name) for name in FEATURE_CONFIG_KEYS}
+    payload = json.dumps(
+        {"data": data_fingerprint, "code": _code_fingerprint(), "config": settings, "params": params or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class FeatureStore:
+    """
+    内容寻址的特征仓库
+    每个条目是一个以键命名的目录：
+    - features.npy：C 连续的 float32 特征矩阵，读取时内存映射，不加载进内存
+    - labels.npy + classes.npy：标签编码和保留原始类型的取值表（数值标签读回仍是数值）
+    - meta.json：特征列名、形状
+    - pipeline.joblib：拟合好的 FeaturePipeline
+    meta.json 的修改时间记录最近一次访问，总大小超过 max_mb 或条目数超过 max_entries 时
+    淘汰最久未使用的条目
+    """
+
+    def __init__(self, root: str | None = None, max_mb: float | None = None, max_entries: int | None = None):
+        """
+        :param root: 仓库目录，默认 config.FEATURE_STORE_DIR
+        :param max_mb: 总容量上限（MB），默认 config.FEATURE_STORE_MAX_MB
+        :param max_entries: 条目数上限，默认 config.FEATURE_STORE_MAX_ENTRIES
+        """
+        self.root = root or config.FEATURE_STORE_DIR
+        self.max_bytes = (max_mb or config.FEATURE_STORE_MAX_MB) * 1024 ** 2
+        self.max_entries = max_entries or config.FEATURE_STORE_MAX_ENTRIES
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def get(self, key: str) -> dict | None:
+        """
+        读取条目，特征矩阵以只读内存映射返回
+        :param key: 键
+        :return: {'x', 'y', 'feature_names', 'pipeline'}；不存在或损坏时返回 None
+        """
+        entry_dir = self._entry_dir(key)
+        meta_path = os.path.join(entry_dir, "meta.json")
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            x = np.load(os.path.join(entry_dir, "features.npy"), mmap_mode="r")
+            codes = np.load(os.path.join(entry_dir, "labels.npy"))
+            # 字符串标签以 Unicode 数组保存；其它类型混杂的标签才会以 object 数组（pickle）保存
+            classes = np.load(os.path.join(entry_dir, "classes.npy"), allow_pickle=True)
+            pipeline = FeaturePipeline.load(os.path.join(entry_dir, "pipeline.joblib"))
+        except (OSError, ValueError, TypeError):
+            return None
+        # 刷新访问时间，用于 LRU 淘汰
+        os.utime(meta_path)
+        return {
+            "x": x,
+            "y": (classes.astype(object) if classes.dtype.kind == "U" else classes)[codes],
+            "feature_names": meta["feature_names"],
+            "pipeline": pipeline
+        }
+
+    def put(self, key: str, x: np.ndarray, y, pipeline: FeaturePipeline) -> str:
+        """
+        写入条目（先写临时目录再整体改名，写到一半中断不会留下损坏的条目），然后按容量淘汰
+        :param key: 键
+        :param x: 特征矩阵
+        :param y: 标签
+        :param pipeline: 拟合好的 FeaturePipeline
+        :return: 条目目录
+        """
+        entry_dir = self._entry_dir(key)
+        tmp_dir = f"{entry_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        codes, classes = pd.factorize(pd.Series(y), sort=True)
+        np.save(os.path.join(tmp_dir, "features.npy"), np.ascontiguousarray(x, dtype=np.float32))
+        np.save(os.path.join(tmp_dir, "labels.npy"), codes.astype(np.int32))
+        class_values = np.asarray(classes)
+        if class_values.dtype == object and all(isinstance(value, str) for value in class_values):
+            class_values = class_values.astype(str)
+        np.save(os.path.join(tmp_dir, "classes.npy"), class_values, allow_pickle=class_values.dtype == object)
+        pipeline.save(os.path.join(tmp_dir, "pipeline.joblib"))
+        meta = {
+            "key": key,
+            "shape": list(x.shape),
+            "feature_names": list(pipeline.feature_names),
+            "classes": [str(value) for value in classes],
+            "created": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+        self.evict(keep=key)
+        return entry_dir
+
+    def _entries(self) -> list:
+        """
+        列出所有条目（内部方法）
+        :return: [(键, 最近访问时间, 字节数)]，按最近访问时间降序
+        """
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for key in os.listdir(self.root):
+            entry_dir = self._entry_dir(key)
+            meta_path = os.path.join(entry_dir, "meta.json")
+            if ".tmp-" in key or not os.path.exists(meta_path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+            entries.append((key, os.path.getmtime(meta_path), size))
+        return sorted(entries, key=lambda entry: entry[1], reverse=True)
+
+    def evict(self, keep: str | None = None) -> list:
+        """
+        淘汰最久未使用的条目，直到总大小和条目数都在上限以内
+        :param keep: 不参与淘汰的键（通常是刚写入的条目）
+        :return: 被淘汰的键
+        """
+        removed = []
+        total, count = 0, 0
+        for key, _, size in self._entries():
+            if key == keep or (total + size <= self.max_bytes and count < self.max_entries):
+                total += size
+                count += 1
+                continue
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            removed.append(key)
+        return removed
+
+    def clear(self) -> None:
+        """
+        清空仓库
+        """
+        shutil.rmtree(self.root, ignore_errors=True)
@@ -1,18 +1,22 @@
 import time
 from pprint import pprint
 
-from config import START, TARGET_COL
+import os
+
+from config import START, TARGET_COL, CLEAN_PARTS_DIR, FEATURE_DIR, PIPELINE_PATH, TABLE_NAME, SYNC_WATERMARK_COL, SYNC_KEY_COL
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import torch
 from torch import nn
 import seaborn as sns
-from data_loader import data_loader
+from data_loader import data_loader, iter_raw_chunks, chunksize_for_budget, raw_data_fingerprint, estimate_num_rows, get_mysql_engine, sync_from_mysql
 from data_explore import data_explore, split_columns_clean
-from data_clean import data_clean
-from feature_engineer import build_features_for_dl
-from ml_model import train_and_evaluate
+from data_clean import data_clean, clean_chunks, wait_clean_data, make_row_hash_set
+from feature_engineer import FeaturePipeline
+from feature_store import FeatureStore, feature_key
+from ml_model import train_and_evaluate_xy
+from predict import load_bundle, predict_new
 
 
 def main():
@@ -21,23 +25,35 @@ def main():
     :return: 
     """
     print(f'{'=' * 30}电商销售数据分析项目{'=' * 30}')
-    # 数据加载
-    print(f'{'-' * 30}数据加载{'-' * 30}')
-    df = data_loader()
-    # 数据探索
-    # print(f'{'-' * 30}数据探索{'-' * 30}')
-    # data_explore()
-    # 自动划分原数据列
-    numeric_cols, categorical_cols = split_columns_clean(df)
-    # 数据清洗
-    print(f'{'-' * 30}数据清洗{'-' * 30}')
-    df_new = data_clean(df, numeric_cols, categorical_cols)
-    # 特征工程
-    print(f'{'-' * 30}特征工程{'-' * 30}')
-    df_new, scaler, encoders = build_features_for_dl(df_new)
+    # 原始数据和清洗 / 特征代码都未变化时，直接从特征仓库读取特征
+    store = FeatureStore()
+    key = feature_key(raw_data_fingerprint())
+    entry = store.get(key)
+    if entry is not None:
+        print(f'{'-' * 30}特征仓库命中{'-' * 30}')
+        print(f'直接使用缓存特征：{key}')
+    else:
+        # 数据加载
+        print(f'{'-' * 30}数据加载{'-' * 30}')
+        df = data_loader()
+        # 数据探索
+        # print(f'{'-' * 30}数据探索{'-' * 30}')
+        # data_explore()
+        # 自动划分原数据列
+        numeric_cols, categorical_cols = split_columns_clean(df)
+        # 数据清洗
+        print(f'{'-' * 30}数据清洗{'-' * 30}')
+        df_new = data_clean(df, numeric_cols, categorical_cols, inplace=True, background_save=True)
+        # 特征工程
+        print(f'{'-' * 30}特征工程{'-' * 30}')
+        pipeline = FeaturePipeline().fit(df_new)
+        store.put(key, pipeline.transform(df_new), df_new[TARGET_COL], pipeline)
+        entry = store.get(key)
+    entry['pipeline'].save(PIPELINE_PATH)
+    features = pd.DataFrame(entry['x'], columns=entry['feature_names'], copy=False)
     # 简单模型训练
     print(f'{'-' * 30}简单模型训练{'-' * 30}')
-    model, metrics, cv_metrics = train_and_evaluate(df_new, TARGET_COL, model_type='rf')
+    model, metrics, cv_metrics = train_and_evaluate_xy(features, entry['y'], model_type='rf')
     print(f'模型信息:{model}')
     print('模型评估指标:')
     pprint(metrics)
@@ -45,10 +61,112 @@ def main():
         f"交叉验证 F1(macro)：均值 = {cv_metrics['cv_mean']:.4f}, "
         f"标准差 = {cv_metrics['cv_std']:.4f}"
     )
+    # 等待后台快照写完，写入失败时在这里报错而不是随进程退出丢失
+    wait_clean_data()
 
     print(f'{'=' * 30}项目完成{'=' * 30}')
 
 
+def _spill_chunks(chunks, out_dir: str, paths: list):
+    """
+    把数据块写入磁盘并原样产出（内部函数）
+    :param chunks: 数据块迭代器
+    :param out_dir: 输出目录
+    :param paths: 收集已写入的文件路径
+    :return: 逐块产出数据
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for i, chunk in enumerate(chunks):
+        chunk = chunk.reset_index(drop=True)
+        path = os.path.join(out_dir, f"part-{i:05d}.feather")
+        chunk.to_feather(path)
+        paths.append(path)
+        yield chunk
+
+
+def main_chunked(budget_mb: float | None = None) -> list:
+    """
+    分块（超出内存）模式：峰值内存由 config.MEMORY_BUDGET_MB 和 config.DEDUP_MEMORY_MB 决定，与总行数无关
+    第一遍：分块读取 -> 清洗 / 跨块去重 -> 清洗结果落盘，同时流式拟合特征流水线
+    第二遍：逐块读取清洗结果 -> 用拟合好的流水线转换 -> 特征直接写入磁盘
+    :param budget_mb: 内存预算（MB），默认 config.MEMORY_BUDGET_MB
+    :return: 特征分块文件路径列表
+    """
+    print(f'{'=' * 30}电商销售数据分析项目（分块模式）{'=' * 30}')
+    chunksize = chunksize_for_budget(budget_mb)
+    print(f'每块行数：{chunksize}')
+    chunks = iter_raw_chunks(chunksize)
+    first = next(chunks)
+    numeric_cols, categorical_cols = split_columns_clean(first)
+
+    def raw_chunks():
+        yield first
+        yield from chunks
+
+    # 跨块去重集合的内存由 config.DEDUP_MEMORY_MB 决定，行数多时改用布隆过滤器
+    seen = make_row_hash_set(estimate_num_rows())
+    print(f'跨块去重：{type(seen).__name__}')
+
+    # 第一遍：清洗并拟合全局统计量
+    print(f'{'-' * 30}数据清洗 + 拟合特征统计量{'-' * 30}')
+    clean_paths = []
+    cleaned = clean_chunks(raw_chunks(), numeric_cols, categorical_cols, seen=seen)
+    pipeline = FeaturePipeline().fit(_spill_chunks(cleaned, CLEAN_PARTS_DIR, clean_paths))
+    # 第二遍：转换并写出特征
+    print(f'{'-' * 30}特征工程{'-' * 30}')
+    os.makedirs(FEATURE_DIR, exist_ok=True)
+    feature_paths = []
+    for i, path in enumerate(clean_paths):
+        df_clean = pd.read_feather(path)
+        df_new = pd.DataFrame(pipeline.transform(df_clean), columns=pipeline.feature_names)
+        df_new[TARGET_COL] = df_clean[TARGET_COL]
+        feature_path = os.path.join(FEATURE_DIR, f"part-{i:05d}.feather")
+        df_new.to_feather(feature_path)
+        feature_paths.append(feature_path)
+    pipeline.save(os.path.join(FEATURE_DIR, 'feature_pipeline.joblib'))
+    print(f'特征已写入：{FEATURE_DIR}（{len(feature_paths)} 个分块）')
+    return feature_paths
+
+
+def main_incremental(
+        engine=None,
+        watermark_col: str | None = None,
+        key_col: str | None = None,
+        model_type: str = 'rf'
+) -> pd.DataFrame:
+    """
+    增量模式：只处理上次同步之后新增 / 变更的行，不重新训练
+    从 MySQL 增量同步 -> 清洗 delta -> 用保存的特征流水线和模型打分
+    需要先运行过 main()，保存了 config.PIPELINE_PATH 和 ../model/{model_type}.joblib
+    :param engine: 数据库，默认 get_mysql_engine()
+    :param watermark_col: 水位列，默认 config.SYNC_WATERMARK_COL
+    :param key_col: 主键列，默认 config.SYNC_KEY_COL
+    :param model_type: 模型类型，对应 ../model/{model_type}.joblib
+    :return: 本次新增 / 变更的行（清洗后）及预测结果列 prediction
+    """
+    print(f'{'=' * 30}电商销售数据分析项目（增量模式）{'=' * 30}')
+    engine = get_mysql_engine() if engine is None else engine
+    print(f'{'-' * 30}增量同步{'-' * 30}')
+    df, delta = sync_from_mysql(
+        engine,
+        TABLE_NAME,
+        watermark_col or SYNC_WATERMARK_COL,
+        key_col if key_col is not None else SYNC_KEY_COL
+    )
+    if delta.empty:
+        print('没有新增 / 变更的数据')
+        return delta.assign(prediction=pd.Series(dtype=object))
+    # 列划分基于完整数据，与全量训练时一致；delta 作为单个数据块清洗，不写清洗快照
+    numeric_cols, categorical_cols = split_columns_clean(df)
+    print(f'{'-' * 30}数据清洗{'-' * 30}')
+    delta = next(clean_chunks([delta], numeric_cols, categorical_cols))
+    print(f'{'-' * 30}模型打分{'-' * 30}')
+    bundle = load_bundle(f'../model/{model_type}.joblib', PIPELINE_PATH)
+    delta['prediction'] = predict_new(delta, bundle)
+    print(f'已打分 {len(delta)} 行')
+    return delta
+
+
 if __name__ == '__main__':
     main()
     print(f'{time.time() - START:.2f}s')
@@ -1,27 +1,34 @@
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
+from sklearn.base import clone
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, \
     classification_report
 
+import config
 from config import START
 import pandas as pd
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split, StratifiedKFold
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
 from joblib import dump
+from dtype_policy import as_feature_matrix
 
 
-def _build_model(model_type: str, random_state: int):
+def _build_model(model_type: str, random_state: int, n_jobs: int = -1):
     """
     构建模型（内部函数）
     :param model_type: 模型类型
     :param random_state: 随机种子
+    :param n_jobs: 随机森林建树的并行数
     """
     if model_type == "rf":
         return RandomForestClassifier(
             n_estimators=200,
             random_state=random_state,
-            n_jobs=-1
+            n_jobs=n_jobs
         )
     elif model_type == "lr":
         return LogisticRegression(
@@ -41,39 +48,97 @@ def _evaluate(model, x_test, y_test) -> dict:
     :return:
         metrics: 评估指标
     """
-    y_pred = model.predict(x_test)
+    return _metrics(y_test, model.predict(x_test))
 
+
+def _metrics(y_true, y_pred) -> dict:
+    """
+    由真实标签和预测结果计算评估指标（内部函数）
+    :param y_true: 真实标签
+    :param y_pred: 预测结果
+    :return:
+        metrics: 评估指标
+    """
     return {
-        "accuracy": accuracy_score(y_test, y_pred),
-        "precision": precision_score(y_test, y_pred, average="weighted"),
-        "recall": recall_score(y_test, y_pred, average="weighted"),
-        "f1": f1_score(y_test, y_pred, average="weighted"),
-        "confusion_matrix": confusion_matrix(y_test, y_pred).tolist(),
+        "accuracy": accuracy_score(y_true, y_pred),
+        "precision": precision_score(y_true, y_pred, average="weighted"),
+        "recall": recall_score(y_true, y_pred, average="weighted"),
+        "f1": f1_score(y_true, y_pred, average="weighted"),
+        "confusion_matrix": confusion_matrix(y_true, y_pred).tolist(),
         "classification_report": classification_report(
-            y_test, y_pred, output_dict=True
+            y_true, y_pred, output_dict=True
         )
     }
 
 
-def cross_validate_model(model, x, y, cv=5):
+def split_cores(n_folds: int, n_jobs: int | None = None) -> tuple[int, int]:
     """
-    交叉验证
-    :param model: 模型
+    在并行的折和单个模型（随机森林建树）之间分配核数
+    :param n_folds: 折数
+    :param n_jobs: 总核数，默认 config.TRAIN_N_JOBS，未设置时为 CPU 核数
+    :return: (同时运行的折数, 每个模型的并行数)
+    """
+    cores = n_jobs or config.TRAIN_N_JOBS or os.cpu_count() or 1
+    fold_jobs = max(1, min(n_folds, cores))
+    return fold_jobs, max(1, cores // fold_jobs)
+
+
+def _take(x, index: np.ndarray):
+    """
+    按行下标取子集，兼容 DataFrame / NumPy 数组 / 稀疏矩阵（内部函数）
+    """
+    return x.iloc[index] if isinstance(x, (pd.DataFrame, pd.Series)) else x[index]
+
+
+def cross_validate_model(model, x, y, cv=5, n_jobs: int | None = None, random_state: int | None = None):
+    """
+    交叉验证（分层 K 折，折之间并行）
+    - 各折在线程池中同时训练，线程共享 x，不复制特征矩阵；
+      树模型建树本身释放 GIL，核数按 split_cores 在折与建树之间分配
+    - 返回每折的模型和样本外预测，可直接复用（如集成预测、误差分析）
+    :param model: 未训练的模型（每折克隆一份）
     :param x: 特征
     :param y: 标签
     :param cv: 交叉验证次数
+    :param n_jobs: 总核数，默认 config.TRAIN_N_JOBS
+    :param random_state: 传入时打乱后再分折，默认与 cross_val_score 一致（不打乱）
     :return: 交叉验证结果
+        cv_mean / cv_std: F1(macro) 的均值和标准差
+        scores: 每折 F1(macro)
+        estimators: 每折训练好的模型
+        oof_pred: 样本外预测（与 y 对齐）
+        folds: 每折的 (训练集下标, 验证集下标)
     """
-    scores = cross_val_score(
-        model,
-        x,
-        y,
-        cv=cv,
-        scoring='f1_macro'
-    )
+    y = np.asarray(y)
+    splitter = StratifiedKFold(n_splits=cv, shuffle=random_state is not None, random_state=random_state)
+    folds = list(splitter.split(np.zeros(len(y)), y))
+    fold_jobs, model_jobs = split_cores(len(folds), n_jobs)
+
+    def fit_fold(fold: tuple):
+        train_index, test_index = fold
+        estimator = clone(model)
+        # 只调整原本就并行的模型（如 n_jobs=-1 的随机森林）
+        if estimator.get_params().get("n_jobs") is not None:
+            estimator.set_params(n_jobs=model_jobs)
+        estimator.fit(_take(x, train_index), y[train_index])
+        return estimator, estimator.predict(_take(x, test_index))
+
+    with ThreadPoolExecutor(max_workers=fold_jobs) as executor:
+        results = list(executor.map(fit_fold, folds))
+    estimators = [estimator for estimator, _ in results]
+    oof_pred = np.empty(len(y), dtype=results[0][1].dtype)
+    scores = []
+    for (_, test_index), (_, pred) in zip(folds, results):
+        oof_pred[test_index] = pred
+        scores.append(f1_score(y[test_index], pred, average="macro"))
+    scores = np.array(scores)
     return {
         'cv_mean': scores.mean(),
-        'cv_std': scores.std()
+        'cv_std': scores.std(),
+        'scores': scores,
+        'estimators': estimators,
+        'oof_pred': oof_pred,
+        'folds': folds
     }
 
 
@@ -82,12 +147,18 @@ def train_and_evaluate(
         target_col: str,
         test_size: float = 0.2,
         random_state: int = 123,
-        model_type: str = 'rf'
+        model_type: str = 'rf',
+        cv: int | None = None,
+        holdout: bool | None = None,
+        n_jobs: int | None = None
 ):
     """
     模型训练模块和评估一体化
     :param df: 特征工程后的数据
     :param target_col: 目标列
+    :param cv: 交叉验证折数，见 train_and_evaluate_xy
+    :param holdout: 是否做留出集训练，见 train_and_evaluate_xy
+    :param n_jobs: 总核数，见 train_and_evaluate_xy
     :return:
         model: 训练好的模型
         metrics: 评估指标
@@ -95,6 +166,49 @@ def train_and_evaluate(
     # 1. 拆分特征和标签
     x = df.drop(columns=[target_col])
     y = df[target_col]
+    return train_and_evaluate_xy(x, y, test_size, random_state, model_type, cv, holdout, n_jobs)
+
+
+def train_and_evaluate_xy(
+        x,
+        y,
+        test_size: float = 0.2,
+        random_state: int = 123,
+        model_type: str = 'rf',
+        cv: int | None = None,
+        holdout: bool | None = None,
+        n_jobs: int | None = None
+):
+    """
+    直接在特征矩阵上训练和评估，x 可以是 DataFrame、NumPy 矩阵或 scipy 稀疏矩阵
+    （如 build_features_for_ml(..., sparse=True) 的结果）
+    - holdout=True：留出集上训练并评估，再做交叉验证
+    - holdout=False：省去留出集训练，评估指标由交叉验证的样本外预测计算，
+      返回的模型为 F1(macro) 最高的一折
+    :param x: 特征
+    :param y: 标签
+    :param cv: 交叉验证折数，默认 config.CV_FOLDS；为 0 时不做交叉验证（此时必须做留出集训练）
+    :param holdout: 是否做留出集训练，默认 config.CV_HOLDOUT
+    :param n_jobs: 总核数，默认 config.TRAIN_N_JOBS
+    :return:
+        model: 训练好的模型
+        metrics: 评估指标
+        cv_metrics: 交叉验证结果（见 cross_validate_model），不做交叉验证时为 None
+    """
+    cv = config.CV_FOLDS if cv is None else cv
+    holdout = config.CV_HOLDOUT if holdout is None else holdout
+    if not cv and not holdout:
+        raise ValueError("交叉验证和留出集训练至少需要一个")
+    # 统一为 float32：随机森林内部本就使用 float32，可避免一次整表复制
+    x = as_feature_matrix(x, stage='模型训练')
+    cv_metrics = None
+    if not holdout:
+        # 只做交叉验证：各折并行训练，指标来自样本外预测
+        cv_metrics = cross_validate_model(_build_model(model_type, random_state), x, y, cv=cv, n_jobs=n_jobs)
+        model = cv_metrics['estimators'][int(np.argmax(cv_metrics['scores']))]
+        dump(model, f'../model/{model_type}.joblib')
+        metrics = _metrics(np.asarray(y), cv_metrics['oof_pred'])
+        return model, metrics, cv_metrics
     # 2. 划分训练集 / 测试集
     x_train, x_test, y_train, y_test = train_test_split(
         x, y,
@@ -103,15 +217,16 @@ def train_and_evaluate(
         stratify=y
     )
     # 3. 构建模型
-    model = _build_model(model_type, random_state)
+    model = _build_model(model_type, random_state, n_jobs=n_jobs or config.TRAIN_N_JOBS or -1)
     # 4. 训练模型
     model.fit(x_train, y_train)
     # 保存模型
     dump(model, f'../model/{model_type}.joblib')
     # 5. 评估模型
     metrics = _evaluate(model, x_test, y_test)
-    # 6. 交叉验证
-    cv_metrics = cross_validate_model(model, x, y)
+    # 6. 交叉验证（各折并行）
+    if cv:
+        cv_metrics = cross_validate_model(_build_model(model_type, random_state), x, y, cv=cv, n_jobs=n_jobs)
 
     return model, metrics, cv_metrics
 
@@ -1,16 +1,36 @@
 import joblib
-from pip._internal.req.req_file import preprocess
+import pandas as pd
 
+from config import PIPELINE_PATH
+from feature_engineer import FeaturePipeline
+
+
+def load_bundle(path, pipeline_path=None):
+    """
+    加载模型和拟合好的特征流水线
+    :param path: 模型文件，可以是模型本身，也可以是包含 model / pipeline 的字典
+    :param pipeline_path: 特征流水线文件，默认 config.PIPELINE_PATH
+    :return: {'model': 模型, 'pipeline': FeaturePipeline}
+    """
+    bundle = joblib.load(path)
+    if not isinstance(bundle, dict):
+        bundle = {'model': bundle}
+    if 'pipeline' not in bundle:
+        bundle['pipeline'] = FeaturePipeline.load(pipeline_path or PIPELINE_PATH)
+    return bundle
 
-def load_bundle(path):
-    return joblib.load(path)
 
 def predict_new(df_new, bundle):
+    """
+    对清洗好的新数据预测
+    :param df_new: 清洗好的新数据
+    :param bundle: load_bundle 的结果
+    :return: 预测结果
+    """
     model = bundle['model']
-    scaler = bundle['scaler']
-    encoders = bundle['encoders']
+    pipeline = bundle['pipeline']
 
-    # 和训练时一模一样的处理流程
-    df_proc = preprocess(df_new, scaler, encoders)
+    # 和训练时一模一样的处理流程：复用拟合好的流水线，只做转换
+    x = pipeline.transform(df_new)
 
-    return model.predict(df_proc)
\ No newline at end of file
+    return model.predict(pd.DataFrame(x, columns=pipeline.feature_names, copy=False))
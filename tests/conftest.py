@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 代码按扁平模块组织（import config），测试时把 code 目录加入搜索路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "code"))
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from data_clean import BloomRowHashSet, RowHashSet, clean_values, hash_rows, make_row_hash_set, remove_duplicates
+
+
+def _chunks():
+    rng = np.random.default_rng(0)
+    base = pd.DataFrame({
+        "age": rng.integers(-100, 100, 200),
+        "revenue": rng.normal(size=200).round(2),
+        "city": rng.choice(list("abc"), 200)
+    })
+    # 同样的行在两个块中被压缩成不同类型：int8 / 含缺失的 float32、category / 字符串
+    first = base.iloc[:100].astype({"age": "int8", "city": "category"})
+    second = pd.concat([base.iloc[:100], base.iloc[100:]], ignore_index=True)
+    second.loc[150, "age"] = np.nan
+    second = second.astype({"age": "float32", "city": "str"})
+    return first, second
+
+
+def test_hash_rows_ignores_storage_dtype():
+    first, second = _chunks()
+    np.testing.assert_array_equal(hash_rows(first), hash_rows(second.iloc[:100]))
+
+
+def test_cross_chunk_duplicates_are_removed():
+    first, second = _chunks()
+    for seen in (RowHashSet(), BloomRowHashSet(1000)):
+        remove_duplicates(first, seen=seen)
+        kept = remove_duplicates(second, seen=seen)
+        assert len(kept) == 100
+
+
+def test_row_hash_set_respects_memory_budget():
+    assert isinstance(make_row_hash_set(1000, memory_mb=1), RowHashSet)
+    bloom = make_row_hash_set(10 ** 7, memory_mb=1)
+    assert isinstance(bloom, BloomRowHashSet) and bloom.bits.nbytes <= 1024 ** 2
+    assert isinstance(make_row_hash_set(None, memory_mb=1), BloomRowHashSet)
+
+
+def test_abnormal_rules_ignore_missing_values():
+    df = pd.DataFrame({
+        "age": [25.0, np.nan, 150.0, -3.0],
+        "city": ["a", None, "x", "b"],
+        "lifecycle": list("wxyz")
+    })
+    rules = [
+        {"name": "age_abnormal", "type": "range", "col": "age", "min": 0, "max": 100},
+        {"name": "city_abnormal", "type": "isin", "col": "city", "values": ["a", "b"]},
+        {"name": "city_format", "type": "regex", "col": "city", "pattern": "[a-z]"}
+    ]
+    cleaned = clean_values(df, ["age"], ["city"], rules=rules)
+    assert cleaned["age_abnormal"].tolist() == [0, 0, 1, 1]
+    assert cleaned["city_abnormal"].tolist() == [0, 0, 1, 0]
+    # 'Unknown' 是填充值，不是原始取值，不判定
+    assert cleaned["city_format"].tolist() == [0, 0, 0, 0]
+    assert cleaned["age"].tolist()[1] == -1 and cleaned["city"].tolist()[1] == "Unknown"
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from data_explore import explore_numeric_features
+from data_stats import DatasetStats
+
+
+def test_in_memory_describe_is_exact():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"revenue": rng.lognormal(5, 1, 30000), "age": rng.integers(0, 90, 30000)})
+    stats = DatasetStats.from_frame(df)
+    result = explore_numeric_features(df, stats=stats)
+    pd.testing.assert_frame_equal(result, df.describe().T)
+    assert stats.describe().attrs["approximate"] == ["25%", "50%", "75%"]
+
+
+def test_correlation_switches_to_sampling(monkeypatch):
+    import config
+    from data_explore import explore_correlation
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=5000)
+    df = pd.DataFrame({"x": x, "y": x + rng.normal(scale=0.1, size=5000), "z": rng.normal(size=5000)})
+    exact, exact_pairs = explore_correlation(df, threshold=0.9)
+    assert "lower" not in exact_pairs
+    monkeypatch.setattr(config, "CORR_SAMPLE_THRESHOLD", 1000)
+    monkeypatch.setattr(config, "CORR_SAMPLE_SIZE", 2000)
+    approx, pairs = explore_correlation(df, method="spearman", threshold=0.9)
+    assert list(zip(pairs["feature1"], pairs["feature2"])) == list(zip(exact_pairs["feature1"], exact_pairs["feature2"]))
+    assert (pairs["lower"] <= pairs["correlation"]).all() and (pairs["correlation"] <= pairs["upper"]).all()
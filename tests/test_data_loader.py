@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+import data_loader
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(config, "SYNC_STATE_PATH", str(tmp_path / "cache" / "sync_state.json"))
+    engine = data_loader.get_mysql_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _write_source(engine, rows: int, start: int = 0, if_exists: str = "replace"):
+    pd.DataFrame({
+        "id": np.arange(start, start + rows),
+        "ts": np.arange(start, start + rows) // 10,
+        "name": [f"n{i}" for i in range(start, start + rows)],
+        # 只有前面的行有值：边界上的小批量 delta 中该列全为 NULL
+        "score": [float(i) if i < 1000 else None for i in range(start, start + rows)]
+    }).to_sql("orders", engine, index=False, if_exists=if_exists)
+
+
+@pytest.mark.parametrize("watermark_col, key_col", [("ts", None), ("ts", "id"), ("id", "id")])
+def test_sync_twice_without_change_is_noop(engine, watermark_col, key_col):
+    _write_source(engine, 1500)
+    df, delta = data_loader.sync_from_mysql(engine, "orders", watermark_col, key_col)
+    assert len(df) == len(delta) == 1500
+    df, delta = data_loader.sync_from_mysql(engine, "orders", watermark_col, key_col)
+    assert delta.empty and len(df) == 1500
+    assert df["id"].is_unique
+
+
+def test_sync_picks_up_rows_at_the_watermark(engine):
+    _write_source(engine, 1505)
+    data_loader.sync_from_mysql(engine, "orders", "ts")
+    # 与当前水位相同的迟到行
+    _write_source(engine, 3, start=1505, if_exists="append")
+    df, delta = data_loader.sync_from_mysql(engine, "orders", "ts")
+    assert delta["id"].tolist() == [1505, 1506, 1507]
+    assert len(df) == 1508 and df["id"].is_unique
+
+
+@pytest.mark.parametrize("method", [None, "multi"])
+def test_save_to_mysql_round_trip(engine, method):
+    df = pd.DataFrame({
+        "id": np.arange(2500),
+        "age": np.where(np.arange(2500) % 7 == 0, np.nan, 30.0),
+        "city": ["a", "b", None, "c", "d"] * 500
+    })
+    stats = data_loader.save_to_mysql(df, "users", engine, batch_size=1000, method=method)
+    assert stats["rows"] == 2500
+    back = pd.read_sql("SELECT * FROM users ORDER BY id", engine)
+    assert back["age"].isna().sum() == df["age"].isna().sum()
+    assert back["city"].isna().sum() == 500
+    # 表已有数据时跳过
+    assert data_loader.save_to_mysql(df, "users", engine, method=method) is None
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from data_stats import approximate_stats
+
+
+def test_approximate_stats_reports_intervals():
+    rng = np.random.default_rng(0)
+    population = pd.DataFrame({
+        "group": np.repeat(["a", "b"], [80000, 20000]),
+        "revenue": np.concatenate([rng.normal(10, 2, 80000), rng.normal(50, 5, 20000)])
+    })
+    # 不等比例分层抽样：b 层抽样比例远高于 a 层
+    sample = pd.concat([population[population.group == "a"].sample(1000, random_state=0),
+                        population[population.group == "b"].sample(1000, random_state=0)])
+    strata_counts = population["group"].value_counts()
+    numeric = approximate_stats(sample, strata_counts, "group")["numeric"]
+    row = numeric.loc["revenue"]
+    true_std = population["revenue"].std()
+    assert row["std_lower"] <= true_std <= row["std_upper"]
+    assert row["mean_lower"] <= population["revenue"].mean() <= row["mean_upper"]
+    assert row["count_lower"] <= 100000 <= row["count_upper"]
+    assert numeric.attrs["bounds_only"] == ["min", "max"]
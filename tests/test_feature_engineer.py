@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from feature_engineer import IncrementalScaler, build_features_for_dl, build_features_for_ml, scale_numeric_features
+
+
+def test_scaler_transform_on_dataframe():
+    df = pd.DataFrame({
+        "a": np.arange(6, dtype=np.float32),
+        "b": np.array([1.0, 2.0, np.nan, 4.0, 5.0, 6.0]),
+        "c": np.arange(6, dtype=np.int8)
+    })
+    scaler = IncrementalScaler().partial_fit(df, ["a", "b", "c"])
+    x = scaler.transform(df)
+    assert x.dtype == np.float32 and x.flags.writeable
+    np.testing.assert_allclose(np.nanmean(x, axis=0), 0, atol=1e-6)
+    # 原数据不被修改
+    assert df["a"].tolist() == list(range(6))
+
+
+def test_scale_numeric_features():
+    df = pd.DataFrame({"a": np.arange(4, dtype=np.float32), "label": list("xyxy")})
+    df_new, scaler = scale_numeric_features(df, ["a"])
+    np.testing.assert_allclose(df_new["a"].to_numpy(), (np.arange(4) - 1.5) / np.arange(4).std(), rtol=1e-6)
+    assert df["a"].tolist() == [0, 1, 2, 3]
+
+
+def test_feature_builds_on_dataframe():
+    df = pd.DataFrame({
+        "age": np.array([20, 30, -1, 40, 50, 60], dtype=np.int8),
+        "revenue": np.array([1.5, 2.5, 3.5, -1, 5.5, 6.5]),
+        "city": pd.Categorical(list("aabbcc")),
+        "lifecycle": list("xyxyxy")
+    })
+    df_ml, _ = build_features_for_ml(df, ["age", "revenue"], ["city"])
+    assert np.isfinite(df_ml[["age", "revenue"]].to_numpy()).all()
+    df_dl, _, _ = build_features_for_dl(df)
+    assert df_dl["revenue"].dtype == np.float32
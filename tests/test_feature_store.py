@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_engineer import FeaturePipeline
+from feature_store import FeatureStore
+
+
+@pytest.mark.parametrize("labels", [
+    [0, 1, 1, 0, 1, 0],
+    ["new", "old", "old", "new", "lost", "new"],
+    [1.5, 2.5, 1.5, 1.5, 2.5, 1.5]
+])
+def test_labels_round_trip_with_original_type(tmp_path, labels):
+    df = pd.DataFrame({"age": np.arange(6, dtype=np.float64), "city": list("abcabc"), "lifecycle": labels})
+    pipeline = FeaturePipeline().fit(df)
+    store = FeatureStore(root=str(tmp_path))
+    store.put("key", pipeline.transform(df), df["lifecycle"], pipeline)
+    entry = store.get("key")
+    assert list(entry["y"]) == labels
+    assert [type(value) for value in entry["y"].tolist()] == [type(value) for value in labels]
+    np.testing.assert_array_equal(entry["x"], pipeline.transform(df))